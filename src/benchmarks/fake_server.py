@@ -0,0 +1,197 @@
+from .stub_backend import StubBackend
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import random
+import threading
+import time
+
+class FakeMessagesServer:
+    """Local HTTP server for the part of the Anthropic Messages API the
+    pipeline uses, with simulated throttling.
+
+    Responses come from StubBackend. More than requests_per_minute requests in
+    any sliding window of window seconds (a minute by default, shorter in
+    tests) are answered with 429 and a retry-after header, and
+    error_rate of the remaining requests fail with 529 (overloaded). Streaming
+    requests get server-sent events like the real API.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, requests_per_minute: Optional[int] = None,
+                 error_rate: float = 0.0, latency: float = 0.0, seconds_per_token: float = 0.0,
+                 seed: int = 0, window: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.window = window
+        self.error_rate = error_rate
+        self.backend = StubBackend(latency, seconds_per_token, seed=seed)
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "completed": 0}
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMessagesServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeMessagesServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def admit(self) -> Tuple[int, Optional[float]]:
+        """Status for the next request and, when throttled, seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            while self._recent and now - self._recent[0] >= self.window:
+                self._recent.popleft()
+            if self.requests_per_minute and len(self._recent) >= self.requests_per_minute:
+                self.stats["throttled"] += 1
+                return 429, self.window - (now - self._recent[0])
+            self._recent.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 529, None
+            return 200, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    with server._lock:
+                        self._send_json(200, dict(server.stats))
+                else:
+                    self._send_json(404, _error("not_found_error", "Unknown path"))
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                if self.path.split("?")[0].rstrip("/") != "/v1/messages":
+                    self._send_json(404, _error("not_found_error", "Unknown path"))
+                    return
+                status, wait = server.admit()
+                if status == 429:
+                    self._send_json(429, _error("rate_limit_error", "Rate limit exceeded"),
+                                    {"retry-after": str(max(1, int(wait + 0.999)))})
+                    return
+                if status != 200:
+                    self._send_json(status, _error("overloaded_error", "Overloaded"))
+                    return
+
+                prompt = _text(body["messages"][-1]["content"])
+                response = server.backend.complete(prompt, body.get("model", ""), body.get("max_tokens", 1024),
+                                                   body.get("temperature", 0), system=_text(body.get("system")))
+                with server._lock:
+                    server.stats["completed"] += 1
+                try:
+                    if body.get("stream"):
+                        self._send_stream(body, response.text, response.usage)
+                    else:
+                        self._send_json(200, _message(body, response.text, response.usage))
+                except (BrokenPipeError, ConnectionResetError):
+                    # Streaming clients hang up once they have what they need
+                    pass
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, body: Dict, text: str, usage: Dict[str, int]):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("cache-control", "no-cache")
+                self.send_header("connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                start = _message(body, "", dict(usage, output_tokens=1))
+                start["content"], start["stop_reason"] = [], None
+                events = [("message_start", {"type": "message_start", "message": start}),
+                          ("content_block_start", {"type": "content_block_start", "index": 0,
+                                                   "content_block": {"type": "text", "text": ""}})]
+                for offset in range(0, len(text), server.backend.chunk_size):
+                    events.append(("content_block_delta", {
+                        "type": "content_block_delta", "index": 0,
+                        "delta": {"type": "text_delta", "text": text[offset:offset + server.backend.chunk_size]}
+                    }))
+                events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                           ("message_delta", {"type": "message_delta",
+                                              "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                              "usage": {"output_tokens": usage["output_tokens"]}}),
+                           ("message_stop", {"type": "message_stop"})]
+                for event, payload in events:
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+        return Handler
+
+def _text(content) -> str:
+    if content is None or isinstance(content, str):
+        return content or ""
+    return "".join(block.get("text", "") for block in content)
+
+def _error(kind: str, message: str) -> Dict:
+    return {"type": "error", "error": {"type": kind, "message": message}}
+
+def _message(body: Dict, text: str, usage: Dict[str, int]) -> Dict:
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve a throttling fake of the Messages API for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=None, help="Requests per minute before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 529")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = FakeMessagesServer(args.host, args.port, args.rpm, args.error_rate, args.latency,
+                                args.seconds_per_token)
+    print(f"Fake Messages API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from ..models import LLMResponse
+from ..llm.backend import LLMBackend, StopCallback
+from ..llm.usage import estimate_tokens, min_cacheable_tokens
+from ..optimization.structured_output import COMPACT_RESPONSE_FORMAT
+from typing import Dict, List, Optional, Set
+import json
+import random
+import re
+import threading
+import time
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+STOP_WORDS = {"a", "an", "the", "to", "of", "and", "in", "on", "into", "at", "it", "then", "with"}
+
+class StubBackend(LLMBackend):
+    """Deterministic offline backend that answers every prompt of the pipeline.
+
+    Translations get a formula built from the instruction's words, window and
+    batch prompts get a "remove" decision for an action that repeats the one
+    before it and "keep" otherwise. Latency is latency seconds per request plus
+    seconds_per_token for every generated token, scaled by a seeded jitter, so
+    runs with the same seed sleep for the same total time. Token usage is
+    estimated from text length. Like the provider, a system prompt of at least
+    min_cacheable_tokens(model) is reported as a cache write the first time and
+    a cache read afterwards; shorter ones count as ordinary input.
+    """
+
+    def __init__(self, latency: float = 0.0, seconds_per_token: float = 0.0, jitter: float = 0.0,
+                 seed: int = 0, chunk_size: int = 16):
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self._seen_systems: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def complete(self, prompt: str, model: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None, stop: Optional[StopCallback] = None) -> LLMResponse:
+        text = self.respond(prompt, system or "")
+        if stop is not None:
+            # Emit the response in chunks like a stream and cut it where the
+            # caller stops reading
+            emitted = []
+            for start in range(0, len(text), self.chunk_size):
+                emitted.append(text[start:start + self.chunk_size])
+                if stop(emitted[-1]):
+                    break
+            text = "".join(emitted)
+
+        with self._lock:
+            scale = 1.0 + self._random.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+            system_tokens = estimate_tokens(system or "")
+            cacheable = system_tokens >= min_cacheable_tokens(model)
+            cached_system = cacheable and system in self._seen_systems
+            if cacheable:
+                self._seen_systems.add(system)
+        output_tokens = estimate_tokens(text)
+        delay = (self.latency + output_tokens * self.seconds_per_token) * scale
+        if delay > 0:
+            time.sleep(delay)
+
+        usage = {
+            "input_tokens": estimate_tokens(prompt) + (0 if cacheable else system_tokens),
+            "cache_creation_input_tokens": system_tokens if cacheable and not cached_system else 0,
+            "cache_read_input_tokens": system_tokens if cached_system else 0,
+            "output_tokens": output_tokens
+        }
+        return LLMResponse(text=text, usage=usage)
+
+    def respond(self, prompt: str, system: str) -> str:
+        if "START:" in system:
+            return self.translation_response(prompt)
+        if "TARGET ACTIONS (index: action):" in prompt:
+            return self.batch_response(prompt)
+        return self.window_response(prompt, compact=COMPACT_RESPONSE_FORMAT in system)
+
+    def translation_response(self, prompt: str) -> str:
+        instruction = prompt.rsplit("\n\n", 1)[-1]
+        words = [w for w in WORD_PATTERN.findall(instruction.lower()) if w not in STOP_WORDS]
+        propositions = ["_".join(words[i:i + 2]) for i in range(0, min(len(words), 6), 2)] or ["task_done"]
+        formula = " & ".join(f"F({prop})" for prop in propositions)
+        return f"The instruction requires each step eventually.\nLTL: START: {formula} FINISH."
+
+    def window_response(self, prompt: str, compact: bool) -> str:
+        current = self._field(prompt, r"Current action: (.*)")
+        previous = self._load_list(self._field(prompt, r"Previous \d+ actions: (.*)"))
+        redundant = bool(previous) and previous[-1] == current
+        if compact:
+            return json.dumps(self.compact_decision(redundant))
+        window_range = re.search(r"^Window range: start (\d+), end (\d+)$", prompt, re.M)
+        start, end = (int(window_range.group(1)), int(window_range.group(2))) if window_range else (0, 0)
+        window = self._load_list(self._field(prompt, r"Analyzed window: (.*)"))
+        return json.dumps(self.full_analysis(current, start, end, window, redundant), indent=4)
+
+    def batch_response(self, prompt: str) -> str:
+        context_text, targets_text = prompt.split("TARGET ACTIONS (index: action):", 1)
+        context = {int(i): action for i, action in re.findall(r"^(\d+): (.*)$", context_text, re.M)}
+        analyses = []
+        for index, action in re.findall(r"^(\d+): (.*)$", targets_text, re.M):
+            index = int(index)
+            window = [context[i] for i in sorted(context)]
+            analysis = self.full_analysis(action, min(context), max(context) + 1, window,
+                                          context.get(index - 1) == action)
+            analyses.append(dict(action_index=index, **analysis))
+        return json.dumps(analyses, indent=4)
+
+    @staticmethod
+    def compact_decision(redundant: bool) -> Dict:
+        return {
+            "decision": "remove" if redundant else "keep",
+            "position_change": None,
+            "actions_to_add": [],
+            "is_position_optimal": True,
+            "is_action_necessary": not redundant,
+            "reason": "Repeats the previous action" if redundant else ""
+        }
+
+    @staticmethod
+    def full_analysis(current: str, start: int, end: int, window: List[str], redundant: bool) -> Dict:
+        reason = "Repeats the previous action" if redundant else "Needed for the task"
+        return {
+            "window_analysis": {
+                "current_action": current,
+                "window_range": {"start": start, "end": end},
+                "analyzed_window": window
+            },
+            "position_analysis": {
+                "is_position_optimal": True,
+                "optimal_position": "current",
+                "reasoning": "The action follows its prerequisites"
+            },
+            "necessity_analysis": {
+                "is_action_necessary": not redundant,
+                "redundancy_reason": reason if redundant else None,
+                "missing_actions": [],
+                "reasoning": reason
+            },
+            "optimization_decision": {
+                "decision": "remove" if redundant else "keep",
+                "details": reason,
+                "suggested_changes": {
+                    "position_change": None,
+                    "actions_to_add": [],
+                    "remove_action": redundant
+                }
+            }
+        }
+
+    @staticmethod
+    def _field(prompt: str, pattern: str) -> str:
+        match = re.search("^" + pattern + "$", prompt, re.M)
+        return match.group(1) if match else ""
+
+    @staticmethod
+    def _load_list(text: str) -> List[str]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return []
+        return value if isinstance(value, list) else []
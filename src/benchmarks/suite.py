@@ -0,0 +1,272 @@
+from ..data.columnar import ColumnarDataset
+from ..data.loaders import dataset_name
+from ..llm.backend import AnthropicBackend, LLMBackend, RecordReplayBackend
+from ..llm.scheduler import configure_scheduler, get_scheduler
+from ..pipeline.action_processor import ActionProcessor
+from .stub_backend import StubBackend
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Direction in which each reported metric gets worse
+LOWER_IS_WORSE = ("plans_per_second",)
+HIGHER_IS_WORSE = ("llm_calls_per_plan", "tokens_per_plan", "latency_p50", "latency_p95", "peak_memory_mb")
+CONFIG_KEYS = ("dataset", "look_back", "look_forward", "plan_length")
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated percentile, as numpy.percentile computes it"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def sample_plans(path: str, plan_length: Optional[int], limit: int) -> List[Dict]:
+    """First limit tasks of a dataset; with plan_length, only tasks that have at
+    least that many steps, truncated to exactly plan_length steps"""
+    dataset = ColumnarDataset.open(path)
+    indices = dataset.indices()
+    if plan_length:
+        indices = indices[dataset.plan_lengths()[indices] >= plan_length]
+    plans = []
+    for index in indices[:limit]:
+        task = dataset.task(int(index))
+        if plan_length:
+            task["steps"] = task["steps"][:plan_length]
+        plans.append(task)
+    return plans
+
+def verify_plans(processor: ActionProcessor, plans: List[Dict], max_retries: int) -> Tuple[List[float], int]:
+    """Verifies every plan once; returns the per-plan latencies and the number of failures"""
+    latencies = []
+    failures = 0
+    for plan in plans:
+        plan_started = time.perf_counter()
+        result = processor.verify_plan(plan["steps"], plan["goal"], max_retries)
+        latencies.append(time.perf_counter() - plan_started)
+        failures += int(not result.success)
+    return latencies, failures
+
+def run_config(plans: List[Dict], backend_factory: Callable[[], LLMBackend], look_back: int, look_forward: int,
+               processor_options: Dict, max_retries: int = 3, repeats: int = 3, warmup: int = 1) -> Dict:
+    """Times the plans repeats times, each run with a fresh processor and
+    backend, after verifying the first warmup plans untimed. Throughput and
+    latencies are the best of the repeats; peak memory is measured in a
+    separate run, since tracing allocations slows the pipeline down."""
+    def new_processor() -> ActionProcessor:
+        # A fresh backend per run keeps simulated prompt caching and jitter
+        # independent of the order of the sweep and of earlier repeats
+        return ActionProcessor("", look_back, look_forward, backend=backend_factory(), verbose=False,
+                               **processor_options)
+
+    if warmup:
+        verify_plans(new_processor(), plans[:warmup], max_retries)
+
+    elapsed = float("inf")
+    latencies = [float("inf")] * len(plans)
+    scheduler_before = get_scheduler().summary()
+    for repeat in range(max(1, repeats)):
+        processor = new_processor()
+        started = time.perf_counter()
+        run_latencies, run_failures = verify_plans(processor, plans, max_retries)
+        elapsed = min(elapsed, time.perf_counter() - started)
+        latencies = [min(best, latency) for best, latency in zip(latencies, run_latencies)]
+        if repeat == 0:
+            # Calls, tokens, failures and retries do not depend on timing, so
+            # the first run reports them
+            failures = run_failures
+            usage = processor.usage_summary()
+            scheduler_after = get_scheduler().summary()
+
+    tracemalloc.start()
+    verify_plans(new_processor(), plans, max_retries)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    calls = 0
+    tokens = 0
+    for totals in usage.values():
+        calls += totals["calls"] - totals["cached_responses"]
+        tokens += (totals["input_tokens"] + totals["cache_creation_input_tokens"]
+                   + totals["cache_read_input_tokens"] + totals["output_tokens"])
+    count = max(1, len(plans))
+    return {
+        "plans": len(plans),
+        "failures": failures,
+        "plans_per_second": round(len(plans) / elapsed, 3) if elapsed > 0 else 0.0,
+        "llm_calls_per_plan": round(calls / count, 3),
+        "tokens_per_plan": round(tokens / count, 1),
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "peak_memory_mb": round(peak / 2 ** 20, 3),
+        "retries": scheduler_after["retries"] - scheduler_before["retries"],
+        "hedges": scheduler_after["hedges"] - scheduler_before["hedges"]
+    }
+
+def run_suite(datasets: List[str], windows: List[Tuple[int, int]], plan_lengths: List[Optional[int]],
+              plans_per_config: int, backend_factory: Callable[[], LLMBackend],
+              processor_options: Optional[Dict] = None, verbose: bool = True,
+              repeats: int = 3, warmup: int = 1) -> List[Dict]:
+    results = []
+    for path, (look_back, look_forward), plan_length in product(datasets, windows, plan_lengths):
+        plans = sample_plans(path, plan_length, plans_per_config)
+        if not plans:
+            continue
+        row = {"dataset": dataset_name(path), "look_back": look_back, "look_forward": look_forward,
+               "plan_length": plan_length}
+        row.update(run_config(plans, backend_factory, look_back, look_forward, processor_options or {},
+                              repeats=repeats, warmup=warmup))
+        results.append(row)
+        if verbose:
+            print(f"{row['dataset']:<20} window={look_back}/{look_forward} length={plan_length or 'all':<4} "
+                  f"{row['plans_per_second']:>8.2f} plans/s {row['llm_calls_per_plan']:>7.2f} calls/plan "
+                  f"{row['tokens_per_plan']:>9.1f} tokens/plan p95={row['latency_p95']:.3f}s "
+                  f"peak={row['peak_memory_mb']:.1f}MB")
+    return results
+
+def compare_to_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Describes every metric that is worse than the matching baseline row by
+    more than tolerance (a fraction of the baseline value)"""
+    reference = {tuple(row[key] for key in CONFIG_KEYS): row for row in baseline}
+    regressions = []
+    for row in results:
+        base = reference.get(tuple(row[key] for key in CONFIG_KEYS))
+        if base is None:
+            continue
+        for metric in LOWER_IS_WORSE + HIGHER_IS_WORSE:
+            old, new = base.get(metric), row.get(metric)
+            if old is None or new is None:
+                continue
+            if metric in LOWER_IS_WORSE:
+                worse = new < old * (1 - tolerance)
+            else:
+                worse = new > old * (1 + tolerance)
+            if worse:
+                config = ", ".join(f"{key}={row[key]}" for key in CONFIG_KEYS)
+                regressions.append(f"{config}: {metric} {old} -> {new}")
+    return regressions
+
+def parse_windows(values: Iterable[str]) -> List[Tuple[int, int]]:
+    windows = []
+    for value in values:
+        look_back, _, look_forward = value.partition(":")
+        windows.append((int(look_back), int(look_forward or look_back)))
+    return windows
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the verification pipeline against an offline backend")
+    parser.add_argument("datasets", nargs="+", help="alfred_tasks.json, vh_tasks.json or alfred_tasks.csv files")
+    parser.add_argument("--windows", nargs="+", default=["1:1", "2:2", "3:3"],
+                        help="look_back:look_forward pairs to sweep")
+    parser.add_argument("--plan-lengths", nargs="+", type=int, default=[0],
+                        help="Truncate plans to these lengths; 0 keeps whole plans")
+    parser.add_argument("--plans", type=int, default=20, help="Plans per configuration")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Timed runs per configuration; the fastest is reported")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Plans verified untimed before each configuration")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per request")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0,
+                        help="Simulated seconds per generated token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative random variation of the latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="Serve responses from a recording instead of the stub")
+    parser.add_argument("--base-url", default=None,
+                        help="Send requests to this endpoint (e.g. src.benchmarks.fake_server) instead of the stub")
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--tokens-per-minute", type=float, default=None)
+    parser.add_argument("--hedge-after", type=float, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--response-format", choices=["full", "compact"], default="full")
+    parser.add_argument("--skip-verified-windows", action="store_true")
+    parser.add_argument("--reuse-translations", action="store_true")
+    parser.add_argument("--rules", action="store_true")
+    parser.add_argument("--max-passes", type=int, default=1)
+    parser.add_argument("--output", default="benchmarks/results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression before the comparison fails")
+    args = parser.parse_args(argv)
+
+    configure_scheduler(requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute,
+                        hedge_after=args.hedge_after)
+    if args.replay:
+        def backend_factory():
+            return RecordReplayBackend(args.replay, mode="replay")
+    elif args.base_url:
+        def backend_factory():
+            return AnthropicBackend("fake-key", base_url=args.base_url)
+    else:
+        def backend_factory():
+            return StubBackend(args.latency, args.seconds_per_token, args.jitter, args.seed)
+
+    settings = {
+        "backend": "replay" if args.replay else "http" if args.base_url else "stub",
+        "plans_per_config": args.plans,
+        "repeats": args.repeats,
+        "warmup": args.warmup,
+        "latency": args.latency,
+        "seconds_per_token": args.seconds_per_token,
+        "jitter": args.jitter,
+        "seed": args.seed,
+        "max_concurrency": args.max_concurrency,
+        "batch_size": args.batch_size,
+        "response_format": args.response_format,
+        "skip_verified_windows": args.skip_verified_windows,
+        "reuse_translations": args.reuse_translations,
+        "use_rules": args.rules,
+        "max_passes": args.max_passes,
+        "requests_per_minute": args.requests_per_minute,
+        "tokens_per_minute": args.tokens_per_minute,
+        "hedge_after": args.hedge_after
+    }
+    processor_options = {
+        "max_concurrency": args.max_concurrency,
+        "batch_size": args.batch_size,
+        "response_format": args.response_format,
+        "skip_verified_windows": args.skip_verified_windows,
+        "reuse_translations": args.reuse_translations,
+        "use_rules": args.rules,
+        "max_passes": args.max_passes,
+        # Step logs of benchmark runs are not kept
+        "log_dir": tempfile.mkdtemp(prefix="verifyllm_bench_")
+    }
+    results = run_suite(args.datasets, parse_windows(args.windows), [length or None for length in args.plan_lengths],
+                        args.plans, backend_factory, processor_options, repeats=args.repeats, warmup=args.warmup)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "settings": settings,
+            "results": results
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print("Warning: baseline was recorded with different settings")
+        regressions = compare_to_baseline(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
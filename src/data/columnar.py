@@ -0,0 +1,177 @@
+from .loaders import dataset_name, iter_tasks
+from typing import Dict, Iterator, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAYS = ("step_ids", "step_offsets", "goal_ids", "split_ids", "string_bytes", "string_offsets")
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), ".cache", "verifyllm", "datasets")
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{dataset_name(path)}.{digest}")
+
+def _source_fingerprint(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+class _StringTable:
+    """Interns strings to dense ids while building a store"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, text: str) -> int:
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[text] = string_id
+            self.strings.append(text)
+        return string_id
+
+    def to_arrays(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def build_store(path: str, directory: str):
+    """Parses a dataset once and writes it as .npy columns plus meta.json.
+
+    Actions, goals and splits share one interned string table stored as a
+    UTF-8 byte blob with offsets. Plans are a flat array of string ids with
+    per-task offsets, so task i has steps step_ids[step_offsets[i]:step_offsets[i + 1]].
+    The store is written to a temporary directory and moved into place.
+    """
+    strings = _StringTable()
+    step_ids: List[int] = []
+    step_offsets = [0]
+    goal_ids: List[int] = []
+    split_ids: List[int] = []
+    for task in iter_tasks(path):
+        step_ids.extend(strings.intern(step) for step in task["steps"])
+        step_offsets.append(len(step_ids))
+        goal_ids.append(strings.intern(task["goal"]))
+        split_ids.append(strings.intern(task["split"]))
+    string_bytes, string_offsets = strings.to_arrays()
+    arrays = {
+        "step_ids": np.asarray(step_ids, dtype=np.int32),
+        "step_offsets": np.asarray(step_offsets, dtype=np.int64),
+        "goal_ids": np.asarray(goal_ids, dtype=np.int32),
+        "split_ids": np.asarray(split_ids, dtype=np.int32),
+        "string_bytes": string_bytes,
+        "string_offsets": string_offsets
+    }
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "name": dataset_name(path),
+        "source": os.path.abspath(path),
+        "fingerprint": _source_fingerprint(path),
+        "tasks": len(goal_ids),
+        "steps": len(step_ids),
+        "strings": len(strings.strings),
+        "splits": sorted({strings.strings[split_id] for split_id in split_ids})
+    }
+
+    parent = os.path.dirname(directory) or "."
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".building_", dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+class ColumnarDataset:
+    """Read-only, memory-mapped view of a dataset built by build_store.
+
+    Only the small metadata file is parsed on open; strings are decoded on
+    first use and plans are materialized one task at a time while iterating.
+    Tasks have the same {task_id, split, goal, steps} shape as iter_tasks.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.name = self.meta["name"]
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+        self._strings: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path: str, cache_dir: Optional[str] = None, rebuild: bool = False) -> "ColumnarDataset":
+        """Opens the cached store of a dataset file, building it first when it
+        is missing, built by another format version or older than the source"""
+        directory = _cache_path(path, cache_dir or default_cache_dir())
+        if rebuild or not cls.is_current(directory, path):
+            build_store(path, directory)
+        return cls(directory)
+
+    @staticmethod
+    def is_current(directory: str, path: str) -> bool:
+        try:
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        return meta.get("format_version") == FORMAT_VERSION and meta.get("fingerprint") == _source_fingerprint(path)
+
+    def __len__(self) -> int:
+        return len(self.goal_ids)
+
+    def string(self, string_id: int) -> str:
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = self.string_offsets[string_id], self.string_offsets[string_id + 1]
+            text = self.string_bytes[start:end].tobytes().decode("utf-8")
+            self._strings[string_id] = text
+        return text
+
+    def split_id(self, split: str) -> Optional[int]:
+        for split_id in np.unique(self.split_ids):
+            if self.string(int(split_id)) == split:
+                return int(split_id)
+        return None
+
+    def step_ids_of(self, index: int) -> np.ndarray:
+        return self.step_ids[self.step_offsets[index]:self.step_offsets[index + 1]]
+
+    def task(self, index: int) -> Dict:
+        return {
+            "task_id": f"{self.name}:{index}",
+            "split": self.string(int(self.split_ids[index])),
+            "goal": self.string(int(self.goal_ids[index])),
+            "steps": [self.string(int(step_id)) for step_id in self.step_ids_of(index)]
+        }
+
+    def indices(self, split: Optional[str] = None) -> np.ndarray:
+        if split is None:
+            return np.arange(len(self))
+        split_id = self.split_id(split)
+        if split_id is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.split_ids == split_id)
+
+    def iter_tasks(self, split: Optional[str] = None) -> Iterator[Dict]:
+        for index in self.indices(split):
+            yield self.task(int(index))
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_tasks()
+
+    def plan_lengths(self) -> np.ndarray:
+        return np.diff(self.step_offsets)
@@ -0,0 +1,65 @@
+from typing import Dict, Iterator, List
+import csv
+import json
+import os
+import re
+
+STEP_NUMBER_PATTERN = re.compile(r"^\s*\d+\.\s*")
+
+def dataset_name(path: str) -> str:
+    """Returns the dataset identifier used as the task id prefix"""
+    return os.path.basename(path)
+
+def split_csv_steps(steps: str) -> List[str]:
+    """Splits a ' | '-joined list of numbered steps into plain actions"""
+    actions = []
+    for step in steps.split(" | "):
+        action = STEP_NUMBER_PATTERN.sub("", step).strip()
+        if action:
+            actions.append(action)
+    return actions
+
+def vh_action_to_text(action: str) -> str:
+    """Converts a VirtualHome action like 'find_toy' into 'Find toy'"""
+    return action.replace("_", " ").strip().capitalize()
+
+def _task(task_id: str, split: str, goal: str, steps: List[str]) -> Dict:
+    return {"task_id": task_id, "split": split, "goal": goal, "steps": steps}
+
+def iter_alfred_json(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    name = dataset_name(path)
+    for i, task in enumerate(data["tasks"]):
+        yield _task(f"{name}:{i}", task.get("split", ""), task["goal"].strip(),
+                    [step.strip() for step in task["high_level_steps"]])
+
+def iter_vh_json(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    name = dataset_name(path)
+    for i, task in enumerate(data["tasks"]):
+        goal = task["high_level_task"].strip()
+        description = task.get("description", "").strip()
+        if description:
+            goal = f"{goal}. {description}"
+        yield _task(f"{name}:{i}", task.get("split", ""), goal,
+                    [vh_action_to_text(action) for action in task["high_level_actions"]])
+
+def iter_alfred_csv(path: str) -> Iterator[Dict]:
+    name = dataset_name(path)
+    with open(path, encoding="utf-8", newline="") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            yield _task(f"{name}:{i}", row.get("split", ""), row["goal"].strip(),
+                        split_csv_steps(row["high_level_steps"]))
+
+def iter_tasks(path: str) -> Iterator[Dict]:
+    """Iterates over tasks of any bundled dataset format as
+    {task_id, split, goal, steps} dictionaries"""
+    if path.endswith(".csv"):
+        return iter_alfred_csv(path)
+    with open(path, encoding="utf-8") as f:
+        first_task = json.load(f)["tasks"][0]
+    if "high_level_actions" in first_task:
+        return iter_vh_json(path)
+    return iter_alfred_json(path)
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import csv
+import re
+import numpy as np
+
+METRICS = ("lcs_similarity", "missing_actions", "extra_actions", "order_errors")
+STEP_NUMBER_PATTERN = re.compile(r"^\s*\d+\.\s*")
+
+def normalize_action(action: str) -> str:
+    """Lowercases an action and strips numbering and trailing punctuation so
+    that 'Walk to kitchen.' and '2. walk to kitchen' intern to the same id"""
+    action = STEP_NUMBER_PATTERN.sub("", action)
+    return " ".join(action.lower().strip(" .").split())
+
+class ActionVocabulary:
+    """Interns normalized action strings to dense integer ids"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.actions: List[str] = []
+
+    def intern(self, action: str) -> int:
+        key = normalize_action(action)
+        action_id = self.ids.get(key)
+        if action_id is None:
+            action_id = len(self.actions)
+            self.ids[key] = action_id
+            self.actions.append(key)
+        return action_id
+
+    def encode(self, actions: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.intern(action) for action in actions), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+def lcs_length(a: np.ndarray, b: np.ndarray) -> int:
+    """Length of the longest common subsequence, one vectorized DP row per element of a.
+
+    Within a row cur[j] = max(cand[1..j]) where cand[j] is prev[j-1] + 1 on a
+    match and prev[j] otherwise, which is exactly a running maximum.
+    """
+    if len(a) == 0 or len(b) == 0:
+        return 0
+    previous = np.zeros(len(b) + 1, dtype=np.int32)
+    current = np.zeros(len(b) + 1, dtype=np.int32)
+    for action_id in a:
+        candidates = np.where(b == action_id, previous[:-1] + 1, previous[1:])
+        np.maximum.accumulate(candidates, out=current[1:])
+        previous, current = current, previous
+    return int(previous[-1])
+
+def occurrence_ranks(ids: np.ndarray) -> np.ndarray:
+    """For every element, how many equal elements precede it"""
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    positions = np.arange(len(ids))
+    group_starts = np.r_[0, np.flatnonzero(np.diff(sorted_ids)) + 1] if len(ids) else np.empty(0, dtype=np.int64)
+    starts = np.zeros(len(ids), dtype=np.int64)
+    starts[group_starts] = group_starts
+    np.maximum.accumulate(starts, out=starts)
+    ranks = np.empty(len(ids), dtype=np.int64)
+    ranks[order] = positions - starts
+    return ranks
+
+def count_inversions(values: np.ndarray) -> int:
+    """Number of pairs i < j with values[i] > values[j].
+
+    Bottom-up merge sort with every level vectorized: keys are offset by the
+    index of the block pair they belong to, so one searchsorted counts, for
+    all right-half elements at once, the larger elements of their left half.
+    O(n log^2 n) time and O(n) memory.
+    """
+    if len(values) < 2:
+        return 0
+    ranks = np.unique(values, return_inverse=True)[1].astype(np.int64).ravel()
+    scale = int(ranks.max()) + 1
+    positions = np.arange(len(ranks))
+    inversions = 0
+    width = 1
+    while width < len(ranks):
+        pairs = positions // (2 * width)
+        right = (positions // width) % 2 == 1
+        keys = pairs * scale + ranks
+        # Left halves are sorted and pairs ascend, so left_keys is sorted
+        left_keys = keys[~right]
+        ends = np.searchsorted(left_keys, (pairs[right] + 1) * scale)
+        inversions += int((ends - np.searchsorted(left_keys, keys[right], side="right")).sum())
+        # Sorting the keys merges every pair in place
+        ranks = np.sort(keys) - pairs * scale
+        width *= 2
+    return inversions
+
+def order_errors(predicted: np.ndarray, ground_truth: np.ndarray) -> int:
+    """Counts pairs of shared actions that appear in the opposite order.
+
+    The k-th occurrence of an action in the prediction is matched with its
+    k-th occurrence in the ground truth; unmatched actions are ignored.
+    """
+    if len(predicted) == 0 or len(ground_truth) == 0:
+        return 0
+    stride = max(len(predicted), len(ground_truth)) + 1
+    predicted_keys = predicted.astype(np.int64) * stride + occurrence_ranks(predicted)
+    truth_keys = ground_truth.astype(np.int64) * stride + occurrence_ranks(ground_truth)
+
+    truth_order = np.argsort(truth_keys)
+    sorted_truth_keys = truth_keys[truth_order]
+    lookup = np.minimum(np.searchsorted(sorted_truth_keys, predicted_keys), len(sorted_truth_keys) - 1)
+    matched = sorted_truth_keys[lookup] == predicted_keys
+    truth_positions = truth_order[lookup[matched]]
+    return count_inversions(truth_positions)
+
+def score_plan(predicted: np.ndarray, ground_truth: np.ndarray, vocabulary_size: int) -> Dict[str, float]:
+    longest = max(len(predicted), len(ground_truth))
+    predicted_counts = np.bincount(predicted, minlength=vocabulary_size)
+    truth_counts = np.bincount(ground_truth, minlength=vocabulary_size)
+    difference = truth_counts - predicted_counts
+    return {
+        "lcs_similarity": lcs_length(predicted, ground_truth) / longest if longest else 1.0,
+        "missing_actions": int(np.clip(difference, 0, None).sum()),
+        "extra_actions": int(np.clip(-difference, 0, None).sum()),
+        "order_errors": order_errors(predicted, ground_truth)
+    }
+
+def score_dataset(records: Iterable[Dict], variants: Tuple[str, ...] = ("original_sequence", "optimized_sequence"),
+                  vocabulary: Optional[ActionVocabulary] = None) -> Tuple[List[Dict], Dict[str, Dict[str, float]]]:
+    """Scores every variant of every record against its ground_truth.
+
+    Records are dictionaries with a task_id, a ground_truth action list and one
+    action list per variant. Returns per-task rows (one column per
+    variant/metric pair) and, per variant, the mean of each metric.
+    """
+    vocabulary = vocabulary or ActionVocabulary()
+    encoded = []
+    for record in records:
+        encoded.append((
+            record["task_id"],
+            vocabulary.encode(record["ground_truth"]),
+            {variant: vocabulary.encode(record[variant]) for variant in variants if record.get(variant) is not None}
+        ))
+
+    # Interning all plans first lets every bincount share one vocabulary size
+    rows = []
+    for task_id, ground_truth, plans in encoded:
+        row = OrderedDict(task_id=task_id)
+        for variant, plan in plans.items():
+            for metric, value in score_plan(plan, ground_truth, len(vocabulary)).items():
+                row[f"{variant}.{metric}"] = value
+        rows.append(row)
+
+    aggregate = {}
+    for variant in variants:
+        columns = {metric: [row[f"{variant}.{metric}"] for row in rows if f"{variant}.{metric}" in row]
+                   for metric in METRICS}
+        if columns["lcs_similarity"]:
+            aggregate[variant] = {metric: float(np.mean(values)) for metric, values in columns.items()}
+            aggregate[variant]["tasks"] = len(columns["lcs_similarity"])
+    return rows, aggregate
+
+def load_experiment_records(path: str) -> List[Dict]:
+    """Reads an experiment CSV like exp3typeact.csv, where each task has an
+    'Initial' ground-truth row and Original/Optimized rows per complexity level"""
+    ground_truth = {}
+    records: Dict[Tuple[str, str], Dict] = OrderedDict()
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            sequence = [action.strip() for action in row["sequence"].split(", ") if action.strip()]
+            if row["sequence_type"] == "Initial":
+                ground_truth[row["task_name"]] = sequence
+                continue
+            key = (row["task_name"], row["complexity"])
+            record = records.setdefault(key, {"task_id": f"{row['task_name']} ({row['complexity']})",
+                                              "task_name": row["task_name"]})
+            record[f"{row['sequence_type'].lower()}_sequence"] = sequence
+
+    scored = []
+    for record in records.values():
+        task_name = record.pop("task_name")
+        if task_name in ground_truth:
+            record["ground_truth"] = ground_truth[task_name]
+            scored.append(record)
+    return scored
+
+def write_table(rows: List[Dict], path: str):
+    columns = list(OrderedDict.fromkeys(column for row in rows for column in row))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Score original and optimized plans against ground truth")
+    parser.add_argument("experiment", help="CSV with task_name, complexity, sequence_type and sequence columns")
+    parser.add_argument("--output", default=None, help="Write the per-task table to this CSV file")
+    args = parser.parse_args(argv)
+
+    rows, aggregate = score_dataset(load_experiment_records(args.experiment))
+    if args.output:
+        write_table(rows, args.output)
+
+    print(f"{'Variant':<20} {'Tasks':>6} " + " ".join(f"{metric:>16}" for metric in METRICS))
+    for variant, values in aggregate.items():
+        print(f"{variant:<20} {values['tasks']:>6} " + " ".join(f"{values[metric]:>16.4f}" for metric in METRICS))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+from ..models import LLMResponse
+from .cache import ResponseCache
+from .scheduler import PRIORITY_WINDOW, get_scheduler
+from .usage import UsageTracker, estimate_tokens, usage_to_dict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import glob
+import inspect
+import json
+import os
+import threading
+
+# Receives every chunk of streamed text and returns True to stop generation
+StopCallback = Callable[[str], bool]
+
+_shared_clients: Dict[Tuple, object] = {}
+_shared_clients_lock = threading.Lock()
+
+def get_shared_client(api_key: str, timeout: float = 60.0, max_connections: int = 16,
+                      base_url: Optional[str] = None):
+    """Returns one Anthropic client per configuration for the whole process"""
+    key = (api_key, timeout, max_connections, base_url)
+    with _shared_clients_lock:
+        if key not in _shared_clients:
+            # Imported here so offline backends work without the SDK installed
+            from anthropic import DEFAULT_CONNECTION_LIMITS, Anthropic, DefaultHttpxClient
+            # The SDK's own Limits class, whichever HTTP library version it uses
+            limits = type(DEFAULT_CONNECTION_LIMITS)(max_connections=max_connections,
+                                                     max_keepalive_connections=max_connections)
+            http_client = DefaultHttpxClient(timeout=timeout, limits=limits)
+            # Retries are left to the request scheduler
+            options = {"api_key": api_key, "timeout": timeout, "http_client": http_client, "max_retries": 0}
+            if base_url:
+                options["base_url"] = base_url
+            _shared_clients[key] = Anthropic(**options)
+        return _shared_clients[key]
+
+class LLMBackend:
+    """Interface for sending one prompt to a model and returning its text.
+
+    When stop is given, implementations pass it every piece of text they
+    receive and end the request as soon as it returns True.
+    """
+
+    def complete(self, prompt: str, model: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None, stop: Optional[StopCallback] = None) -> LLMResponse:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+def _accepts_argument(method: Callable, name: str) -> bool:
+    try:
+        parameters = inspect.signature(method).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(p.name == name or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+class AnthropicBackend(LLMBackend):
+    def __init__(self, api_key: str, timeout: float = 60.0, max_connections: int = 16,
+                 base_url: Optional[str] = None):
+        self.client = get_shared_client(api_key, timeout, max_connections, base_url)
+        # Newer SDK releases no longer take a sampling temperature
+        self.sends_temperature = all(_accepts_argument(method, "temperature")
+                                     for method in (self.client.messages.create, self.client.messages.stream))
+
+    def complete(self, prompt: str, model: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None, stop: Optional[StopCallback] = None) -> LLMResponse:
+        request = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if self.sends_temperature:
+            request["temperature"] = temperature
+        if system:
+            # The shared prefix is marked for the provider's prompt cache, which
+            # ignores the marker below min_cacheable_tokens(model)
+            request["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+        if stop is None:
+            message = self.client.messages.create(**request)
+            return LLMResponse(text=message.content[0].text,
+                               usage=usage_to_dict(getattr(message, "usage", None)))
+
+        chunks = []
+        stopped = False
+        with self.client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                chunks.append(text)
+                # Leaving the context manager closes the connection, so
+                # nothing after the stop point is generated
+                if stop(text):
+                    stopped = True
+                    break
+            usage = usage_to_dict(getattr(getattr(stream, "current_message_snapshot", None), "usage", None))
+        text = "".join(chunks)
+        if stopped:
+            # The final output count arrives with message_delta at the end of
+            # the stream; a cut stream only has message_start's placeholder
+            usage["output_tokens"] = max(usage["output_tokens"], estimate_tokens(text))
+        return LLMResponse(text=text, usage=usage)
+
+class ReplayMissError(LookupError):
+    pass
+
+class RecordReplayBackend(LLMBackend):
+    """Saves responses of an inner backend to JSONL files and replays them.
+
+    In "record" mode every request goes to inner and its response is appended
+    to path. In "replay" mode responses are served from the recorded files
+    only, keyed like the response cache, and an unknown request raises
+    ReplayMissError. If path is a directory each recording process writes
+    its own responses_<pid>.jsonl and replay reads every file in it; a path
+    ending in a separator is created as a directory.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", inner: Optional[LLMBackend] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording needs an inner backend")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._file = None
+        self.responses: Dict[str, LLMResponse] = {}
+        if mode == "replay":
+            for record in self._read_records():
+                self.responses[record["key"]] = LLMResponse(text=record["text"], usage=record.get("usage", {}))
+
+    def _read_records(self) -> Iterator[Dict]:
+        paths = sorted(glob.glob(os.path.join(self.path, "*.jsonl"))) if os.path.isdir(self.path) else [self.path]
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash while recording can leave a truncated last line
+                        continue
+
+    def _record_path(self) -> str:
+        if self.path.endswith(("/", os.sep)):
+            os.makedirs(self.path, exist_ok=True)
+        if os.path.isdir(self.path):
+            return os.path.join(self.path, f"responses_{os.getpid()}.jsonl")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return self.path
+
+    def complete(self, prompt: str, model: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None, stop: Optional[StopCallback] = None) -> LLMResponse:
+        key = ResponseCache.make_key(model, max_tokens, temperature, prompt, system=system or "")
+        if self.mode == "replay":
+            if key not in self.responses:
+                raise ReplayMissError(f"No recorded response for request {key[:12]}")
+            response = self.responses[key]
+            if stop is not None:
+                stop(response.text)
+            return response
+
+        response = self.inner.complete(prompt, model, max_tokens, temperature, system=system, stop=stop)
+        line = json.dumps({"key": key, "model": model, "text": response.text, "usage": response.usage})
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._record_path(), "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def create_backend(api_key: str, timeout: float = 60.0, max_connections: int = 16,
+                   base_url: Optional[str] = None, record_path: Optional[str] = None,
+                   replay_path: Optional[str] = None) -> LLMBackend:
+    if replay_path:
+        return RecordReplayBackend(replay_path, mode="replay")
+    backend = AnthropicBackend(api_key, timeout=timeout, max_connections=max_connections, base_url=base_url)
+    if record_path:
+        return RecordReplayBackend(record_path, mode="record", inner=backend)
+    return backend
+
+def rate_limited_tokens(response: LLMResponse) -> int:
+    """Tokens of a response that count towards the tokens-per-minute limit;
+    cache reads do not"""
+    return (response.usage.get("input_tokens", 0) + response.usage.get("cache_creation_input_tokens", 0)
+            + response.usage.get("output_tokens", 0))
+
+class LLMCaller:
+    """Shared request path of the LLM-backed components.
+
+    Subclasses set model, backend, cache, usage and metrics; llm_stage labels
+    their calls in usage records and metrics and llm_priority orders them in
+    the process-wide request scheduler.
+    """
+
+    llm_stage = "llm"
+    llm_priority = PRIORITY_WINDOW
+    model: str
+    backend: LLMBackend
+    cache: Optional[ResponseCache]
+    usage: UsageTracker
+
+    def generate_response(self, prompt: str, max_tokens: int = 1024, system: Optional[str] = None,
+                          stop: Optional[StopCallback] = None) -> str:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model, max_tokens, 0, prompt, system=system or "")
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.usage.record(None, label=self.llm_stage, cached_response=True)
+                self.metrics.record_usage(self.llm_stage, None, cached_response=True)
+                return cached
+
+        scheduler = get_scheduler()
+        reserved = estimate_tokens(prompt) + estimate_tokens(system or "")
+        self.metrics.increment("llm_calls", stage=self.llm_stage)
+        try:
+            with self.metrics.timer("stage", stage=self.llm_stage):
+                response = scheduler.call(
+                    lambda: self.backend.complete(prompt, self.model, max_tokens, 0, system=system, stop=stop),
+                    priority=self.llm_priority,
+                    tokens=reserved,
+                    # A streaming callback keeps state, so those calls are never hedged
+                    hedge=stop is None,
+                    on_event=lambda event: self.metrics.increment("scheduler_events", stage=self.llm_stage,
+                                                                  event=event),
+                    measure=rate_limited_tokens
+                )
+        except Exception as e:
+            self.metrics.increment("llm_errors", stage=self.llm_stage)
+            raise Exception(f"Error generating response: {str(e)}")
+        self.usage.record(response.usage, label=self.llm_stage)
+        self.metrics.record_usage(self.llm_stage, response.usage)
+        if cache_key is not None:
+            self.cache.put(cache_key, response.text)
+        return response.text
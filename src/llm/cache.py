@@ -0,0 +1,120 @@
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Share of max_entries evicted at once, so the table is counted and pruned
+# once per batch of writes rather than on every write
+EVICTION_FRACTION = 0.1
+
+class ResponseCache:
+    """On-disk cache of LLM responses keyed by a hash of the request.
+
+    Only deterministic (temperature=0) requests should be cached. Once
+    max_entries is exceeded, the least recently used entries are evicted down
+    to low_watermark. The database can be shared by several processes; each
+    counts its own writes and recounts the table when its estimate passes
+    max_entries, so the table can briefly hold up to one eviction batch per
+    process more. In read_only mode lookups never modify it and new responses
+    are not stored.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, read_only: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.low_watermark = max(1, int(max_entries * (1 - EVICTION_FRACTION)))
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30,
+                                         check_same_thread=False)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)"
+            )
+            self._conn.commit()
+        # Entries written since the last count are added to it, replacements
+        # included, so it can only overestimate and trigger an early recount
+        self._estimated_entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, max_tokens: int, temperature: float, prompt: str, system: str = "") -> str:
+        request = [model, max_tokens, temperature, prompt]
+        if system:
+            request.append(system)
+        payload = json.dumps(request, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.read_only:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str):
+        if self.read_only:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, last_access) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._estimated_entries += 1
+            if self._estimated_entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Deletes the least recently used entries down to low_watermark if
+        the table, written to by other processes too, is over max_entries"""
+        entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if entries > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (entries - self.low_watermark,)
+            )
+            entries = self.low_watermark
+        self._estimated_entries = entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self)
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
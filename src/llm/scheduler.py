@@ -0,0 +1,250 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+import heapq
+import itertools
+import random
+import threading
+import time
+
+T = TypeVar("T")
+
+# Lower values are admitted first when the budgets are exhausted
+PRIORITY_LTL = 0
+PRIORITY_WINDOW = 1
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout", "TimeoutError"}
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to capacity (one minute's
+    worth by default). The level may go negative when a call turns out to use
+    more than was reserved for it; later callers then wait off the debt."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available; 0 when it can be taken now"""
+        self._refill(now)
+        # A request larger than the whole bucket is let through once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+def retry_after(error: Exception) -> Optional[float]:
+    """The server's retry-after header in seconds, if the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """Admits LLM calls within requests- and tokens-per-minute budgets,
+    retries throttled and failed calls and optionally hedges slow ones.
+
+    Waiting calls are admitted strictly by (priority, arrival). Retries use
+    full-jitter exponential backoff, never shorter than a retry-after header.
+    With hedge_after set, a call that has not finished after that many
+    seconds is started a second time and the first result wins; only calls
+    without side effects on the caller (no streaming callback) are hedged.
+    A hedge is only sent when the budgets admit it right away.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 hedge_after: Optional[float] = None, seed: Optional[int] = None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.stats = {"admitted": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+        self._random = random.Random(seed)
+        self._condition = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def limited(self) -> bool:
+        return self.request_bucket is not None or self.token_bucket is not None
+
+    def acquire(self, priority: int = PRIORITY_WINDOW, tokens: int = 0):
+        """Blocks until the call may start and charges it to the budgets"""
+        with self._condition:
+            self.stats["admitted"] += 1
+            if not self.limited:
+                return
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        now = time.monotonic()
+                        delay = max(bucket.wait_time(amount, now) for bucket, amount in self._charges(tokens))
+                        if delay == 0:
+                            for bucket, amount in self._charges(tokens):
+                                bucket.take(amount)
+                            return
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def try_acquire(self, priority: int = PRIORITY_WINDOW, tokens: int = 0) -> bool:
+        """Admits a call only if nobody is waiting and the budgets allow it now"""
+        with self._condition:
+            if self.limited:
+                if self._waiting:
+                    return False
+                now = time.monotonic()
+                if any(bucket.wait_time(amount, now) > 0 for bucket, amount in self._charges(tokens)):
+                    return False
+                for bucket, amount in self._charges(tokens):
+                    bucket.take(amount)
+            self.stats["admitted"] += 1
+            return True
+
+    def refund(self, tokens: int = 0):
+        """Returns the budget of an admitted call that was never sent"""
+        with self._condition:
+            self.stats["admitted"] -= 1
+            for bucket, amount in self._charges(tokens):
+                bucket.take(-amount)
+            self._condition.notify_all()
+
+    def _charges(self, tokens: int) -> List[Tuple[TokenBucket, float]]:
+        charges = [(self.request_bucket, 1)] if self.request_bucket else []
+        if self.token_bucket:
+            charges.append((self.token_bucket, tokens))
+        return charges
+
+    def settle(self, reserved: int, used: int):
+        """Corrects the token budget once the actual usage of a call is known"""
+        if self.token_bucket is not None and used != reserved:
+            with self._condition:
+                self.token_bucket.take(used - reserved)
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        with self._condition:
+            delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after(error) or 0.0)
+
+    def call(self, fn: Callable[[], T], priority: int = PRIORITY_WINDOW, tokens: int = 0, hedge: bool = True,
+             on_event: Optional[Callable[[str], None]] = None,
+             measure: Optional[Callable[[T], int]] = None) -> T:
+        """Runs fn within the budgets, retrying retryable errors. tokens is the
+        estimated size of the request reserved from the tokens-per-minute budget;
+        with measure, every request is settled against the tokens measure reports
+        for its result and failed requests are refunded."""
+        attempt = 0
+        while True:
+            self.acquire(priority, tokens)
+            try:
+                if hedge and self.hedge_after is not None:
+                    return self._hedged(fn, priority, tokens, on_event, measure)
+                return self._settled(fn(), tokens, measure)
+            except Exception as e:
+                if measure is not None:
+                    self.settle(tokens, 0)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    with self._condition:
+                        self.stats["failures"] += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                with self._condition:
+                    self.stats["retries"] += 1
+                if on_event:
+                    on_event("retry")
+                time.sleep(delay)
+
+    def _settled(self, result: T, tokens: int, measure: Optional[Callable[[T], int]]) -> T:
+        if measure is not None:
+            self.settle(tokens, measure(result))
+        return result
+
+    def _hedged(self, fn: Callable[[], T], priority: int, tokens: int,
+                on_event: Optional[Callable[[str], None]], measure: Optional[Callable[[T], int]]) -> T:
+        with self._condition:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+        primary = self._hedge_pool.submit(fn)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        # Waiting for budget would only delay the primary's result, so without
+        # room for a second request right now the call is not hedged
+        if done or not self.try_acquire(priority, tokens):
+            return self._settled(primary.result(), tokens, measure)
+        if primary.done():
+            self.refund(tokens)
+            return self._settled(primary.result(), tokens, measure)
+
+        with self._condition:
+            self.stats["hedges"] += 1
+        if on_event:
+            on_event("hedge")
+        futures = {primary, self._hedge_pool.submit(fn)}
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._condition:
+                            self.stats["hedge_wins"] += 1
+                    for loser in futures:
+                        # The losing request is settled whenever it finishes
+                        loser.add_done_callback(lambda f: self._settle_future(f, tokens, measure))
+                    return self._settled(future.result(), tokens, measure)
+                error = future.exception()
+        # Both failed: the hedge is refunded here, the primary by call()
+        if measure is not None:
+            self.settle(tokens, 0)
+        raise error
+
+    def _settle_future(self, future, tokens: int, measure: Optional[Callable[[T], int]]):
+        if measure is None:
+            return
+        self.settle(tokens, measure(future.result()) if future.exception() is None else 0)
+
+    def summary(self) -> Dict[str, int]:
+        with self._condition:
+            return dict(self.stats)
+
+_scheduler = RequestScheduler()
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> RequestScheduler:
+    return _scheduler
+
+def configure_scheduler(**options) -> RequestScheduler:
+    """Replaces the process-wide scheduler; options are those of RequestScheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = RequestScheduler(**options)
+    return _scheduler
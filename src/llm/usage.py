@@ -0,0 +1,58 @@
+from typing import Dict, List
+import threading
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+CHARS_PER_TOKEN = 4
+# The provider only caches prompt prefixes of at least this many tokens
+# (twice as many for Haiku models); shorter prefixes marked for caching are
+# billed as ordinary input
+MIN_CACHEABLE_TOKENS = 1024
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for budgeting before the real usage is known"""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+def min_cacheable_tokens(model: str) -> int:
+    return 2 * MIN_CACHEABLE_TOKENS if "haiku" in model else MIN_CACHEABLE_TOKENS
+
+def usage_to_dict(usage) -> Dict[str, int]:
+    """Token counts of an SDK usage object or of an already converted dict"""
+    if isinstance(usage, dict):
+        return {field: int(usage.get(field, 0) or 0) for field in USAGE_FIELDS}
+    return {field: int(getattr(usage, field, 0) or 0) for field in USAGE_FIELDS}
+
+class UsageTracker:
+    """Thread-safe record of token usage per LLM call plus running totals.
+
+    Cached-response hits are recorded with zero tokens so call counts stay
+    comparable across runs with and without the response cache.
+    """
+
+    def __init__(self, keep_calls: bool = True):
+        self.keep_calls = keep_calls
+        self.calls: List[Dict] = []
+        self.totals = {field: 0 for field in USAGE_FIELDS}
+        self.totals.update(calls=0, cached_responses=0)
+        self._lock = threading.Lock()
+
+    def record(self, usage, label: str = "", cached_response: bool = False):
+        entry = usage_to_dict(usage)
+        entry.update(label=label, cached_response=cached_response)
+        with self._lock:
+            for field in USAGE_FIELDS:
+                self.totals[field] += entry[field]
+            self.totals["calls"] += 1
+            self.totals["cached_responses"] += int(cached_response)
+            if self.keep_calls:
+                self.calls.append(entry)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.totals)
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+            for field in self.totals:
+                self.totals[field] = 0
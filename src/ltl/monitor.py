@@ -0,0 +1,233 @@
+from ..models import MonitorReport
+from .parser import Formula, atomic_propositions, normalize_formula, parse_ltl
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import re
+
+TRUE = ("const", True)
+FALSE = ("const", False)
+
+PropositionMapper = Callable[[str], Iterable[str]]
+
+STOP_WORDS = {"a", "an", "the", "to", "at", "on", "in", "of", "from", "into", "onto", "with", "and", "is"}
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _content_words(text: str) -> Set[str]:
+    return {_stem(word) for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS}
+
+class KeywordPropositionMapper:
+    """Maps an action to every proposition whose content words all occur in it,
+    e.g. 'Grab the thermometer from the table' -> grab_thermometer.
+
+    Explicit overrides take precedence for actions the keyword rule gets wrong.
+    """
+
+    def __init__(self, propositions: Iterable[str], overrides: Optional[Dict[str, Iterable[str]]] = None):
+        self.proposition_words = {
+            prop: _content_words(prop.replace("_", " ")) for prop in propositions
+        }
+        self.overrides = {action: set(props) for action, props in (overrides or {}).items()}
+
+    def __call__(self, action: str) -> Set[str]:
+        if action in self.overrides:
+            return self.overrides[action]
+        words = _content_words(action)
+        return {prop for prop, required in self.proposition_words.items() if required and required <= words}
+
+def _make_not(formula: Formula) -> Formula:
+    if formula[0] == "const":
+        return FALSE if formula[1] else TRUE
+    if formula[0] == "not":
+        return formula[1]
+    return ("not", formula)
+
+def _make_junction(kind: str, parts: Iterable[Formula]) -> Formula:
+    # Conjunctions and disjunctions are kept flat and order-free so that
+    # equivalent progression states compare equal and the state space stays small
+    absorbing, neutral = (FALSE, TRUE) if kind == "and" else (TRUE, FALSE)
+    items = set()
+    for part in parts:
+        if part == absorbing:
+            return absorbing
+        if part == neutral:
+            continue
+        if part[0] == kind:
+            items.update(part[1])
+        else:
+            items.add(part)
+    if not items:
+        return neutral
+    if len(items) == 1:
+        return next(iter(items))
+    return (kind, frozenset(items))
+
+def compile_formula(formula: Formula) -> Formula:
+    """Rewrites a parsed formula into the canonical form used as monitor state"""
+    kind = formula[0]
+    if kind in ("ap", "const"):
+        return formula
+    if kind == "not":
+        return _make_not(compile_formula(formula[1]))
+    if kind in ("X", "G", "F"):
+        return (kind, compile_formula(formula[1]))
+    left, right = compile_formula(formula[1]), compile_formula(formula[2])
+    if kind in ("and", "or"):
+        return _make_junction(kind, [left, right])
+    if kind == "implies":
+        return _make_junction("or", [_make_not(left), right])
+    if kind == "iff":
+        return _make_junction("or", [
+            _make_junction("and", [left, right]),
+            _make_junction("and", [_make_not(left), _make_not(right)])
+        ])
+    return ("U", left, right)
+
+def progress(formula: Formula, props: FrozenSet[str]) -> Formula:
+    """Formula progression: the obligation left for the rest of the trace
+    after observing one step in which exactly `props` hold.
+
+    X is a strong next: X f leaves ("N", f), which requires another step and
+    f to hold at it. Keeping it apart from a plain f lets accepts_empty tell
+    "f from here on" (G f, true at the end) from "a next step satisfying f"
+    (false at the end)."""
+    kind = formula[0]
+    if kind == "const":
+        return formula
+    if kind == "N":
+        return progress(formula[1], props)
+    if kind == "ap":
+        return TRUE if formula[1] in props else FALSE
+    if kind == "not":
+        return _make_not(progress(formula[1], props))
+    if kind in ("and", "or"):
+        return _make_junction(kind, [progress(part, props) for part in formula[1]])
+    if kind == "X":
+        return ("N", formula[1])
+    if kind == "G":
+        return _make_junction("and", [progress(formula[1], props), formula])
+    if kind == "F":
+        return _make_junction("or", [progress(formula[1], props), formula])
+    return _make_junction("or", [
+        progress(formula[2], props),
+        _make_junction("and", [progress(formula[1], props), formula])
+    ])
+
+def accepts_empty(formula: Formula) -> bool:
+    """Evaluates the remaining obligation at the end of a finite trace, that
+    is, on the empty suffix: G holds vacuously, while propositions, F, U and
+    pending next steps (X and N) need a step that does not exist"""
+    kind = formula[0]
+    if kind == "const":
+        return formula[1]
+    if kind == "not":
+        return not accepts_empty(formula[1])
+    if kind == "and":
+        return all(accepts_empty(part) for part in formula[1])
+    if kind == "or":
+        return any(accepts_empty(part) for part in formula[1])
+    return kind == "G"
+
+def verdict(state: Formula) -> str:
+    if state == TRUE:
+        return "satisfied"
+    if state == FALSE:
+        return "violated"
+    return "pending"
+
+class LTLfMonitor:
+    """Finite-trace monitor for one formula.
+
+    The formula is the initial state of a deterministic automaton whose
+    transitions are computed by progression on first use and memoized, so
+    repeated runs over plans for the same task only pay for dictionary lookups.
+    """
+
+    def __init__(self, formula: str, mapper: Optional[PropositionMapper] = None):
+        parsed = parse_ltl(normalize_formula(formula))
+        self.initial_state = compile_formula(parsed)
+        self.propositions = frozenset(atomic_propositions(parsed))
+        self.mapper = mapper or KeywordPropositionMapper(self.propositions)
+        self._transitions: Dict[Tuple[Formula, FrozenSet[str]], Formula] = {}
+
+    def label(self, action: str) -> FrozenSet[str]:
+        return frozenset(self.mapper(action)) & self.propositions
+
+    def step(self, state: Formula, label: FrozenSet[str]) -> Formula:
+        key = (state, label)
+        next_state = self._transitions.get(key)
+        if next_state is None:
+            next_state = progress(state, label)
+            self._transitions[key] = next_state
+        return next_state
+
+    def run(self) -> "MonitorRun":
+        return MonitorRun(self)
+
+    def analyze(self, sequence: List[str]) -> MonitorReport:
+        labels = [self.label(action) for action in sequence]
+        states = [self.initial_state]
+        verdicts = []
+        violations = []
+        for i, label in enumerate(labels):
+            state = self.step(states[-1], label)
+            states.append(state)
+            verdicts.append(verdict(state))
+            if state == FALSE and states[-2] != FALSE:
+                violations.append(i)
+        accepted = accepts_empty(states[-1])
+
+        # An action is necessary when dropping it turns an accepted plan into a
+        # rejected one. Suffix results are memoized per (state, position), so
+        # a skip path that rejoins the original run is resolved in O(1).
+        necessary = []
+        if accepted:
+            suffix_accepts: Dict[Tuple[Formula, int], bool] = {}
+            for i in range(len(sequence)):
+                if accepts_skipping(self, states[i], i + 1, labels, suffix_accepts) is False:
+                    necessary.append(i)
+
+        return MonitorReport(
+            accepted=accepted,
+            verdicts=verdicts,
+            violations=violations,
+            irrelevant=[i for i, label in enumerate(labels) if not label],
+            necessary=necessary
+        )
+
+def accepts_skipping(monitor: LTLfMonitor, state: Formula, position: int, labels: List[FrozenSet[str]],
+                     memo: Dict[Tuple[Formula, int], bool]) -> bool:
+    path = []
+    while (state, position) not in memo:
+        if position == len(labels) or state in (TRUE, FALSE):
+            memo[(state, position)] = accepts_empty(state)
+            break
+        path.append((state, position))
+        state = monitor.step(state, labels[position])
+        position += 1
+    result = memo[(state, position)]
+    for key in path:
+        memo[key] = result
+    return result
+
+class MonitorRun:
+    """Incremental run of a monitor over actions as they arrive"""
+
+    def __init__(self, monitor: LTLfMonitor):
+        self.monitor = monitor
+        self.state = monitor.initial_state
+        self.position = 0
+
+    def step(self, action: str) -> str:
+        self.state = self.monitor.step(self.state, self.monitor.label(action))
+        self.position += 1
+        return verdict(self.state)
+
+    @property
+    def accepting(self) -> bool:
+        return accepts_empty(self.state)
@@ -0,0 +1,168 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import re
+
+# Formulas are parsed into nested tuples:
+#   ("ap", name), ("const", bool), ("not", f), ("X", f), ("G", f), ("F", f),
+#   ("and", f, g), ("or", f, g), ("implies", f, g), ("iff", f, g), ("U", f, g)
+Formula = Tuple
+
+UNICODE_OPERATORS = {
+    "∧": "&", "∨": "|", "¬": "!", "→": "->", "↔": "<->", "⇒": "->", "⇔": "<->",
+    "◯": "X", "□": "G", "◇": "F", "&&": "&", "||": "|", "<=>": "<->", "=>": "->"
+}
+UNICODE_PATTERN = re.compile("|".join(re.escape(op) for op in sorted(UNICODE_OPERATORS, key=len, reverse=True)))
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(<->|->|[()!&|])|([A-Za-z_][A-Za-z0-9_]*))")
+UNARY_TEMPORAL = set("XGF")
+
+class LTLSyntaxError(ValueError):
+    pass
+
+def normalize_formula(formula: str) -> str:
+    """Strips START:/FINISH. markers, maps Unicode operators to ASCII and collapses whitespace"""
+    formula = formula.replace("START:", "").replace("FINISH.", "")
+    formula = UNICODE_PATTERN.sub(lambda m: UNICODE_OPERATORS[m.group(0)], formula)
+    return " ".join(formula.split())
+
+def tokenize(formula: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    position = 0
+    formula = formula.rstrip()
+    while position < len(formula):
+        match = TOKEN_PATTERN.match(formula, position)
+        if match is None:
+            position += len(formula[position:]) - len(formula[position:].lstrip())
+            raise LTLSyntaxError(f"Unexpected character {formula[position]!r} at position {position}")
+        operator, name = match.groups()
+        start = match.start(1) if operator else match.start(2)
+        if operator:
+            tokens.append(("op", operator, start))
+        elif name in ("true", "false"):
+            tokens.append(("const", name, start))
+        elif name == "U":
+            tokens.append(("op", "U", start))
+        elif set(name) <= UNARY_TEMPORAL:
+            # Chains such as GF or XX are sequences of unary operators
+            for offset, operator_name in enumerate(name):
+                tokens.append(("op", operator_name, start + offset))
+        else:
+            tokens.append(("ap", name, start))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str, int]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str, int]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "", -1)
+
+    def accept(self, operator: str) -> bool:
+        kind, value, _ = self.peek()
+        if kind == "op" and value == operator:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> Formula:
+        if not self.tokens:
+            raise LTLSyntaxError("Empty formula")
+        formula = self.parse_iff()
+        kind, value, position = self.peek()
+        if kind != "end":
+            raise LTLSyntaxError(f"Unexpected token {value!r} at position {position}")
+        return formula
+
+    def parse_iff(self) -> Formula:
+        formula = self.parse_implies()
+        while self.accept("<->"):
+            formula = ("iff", formula, self.parse_implies())
+        return formula
+
+    def parse_implies(self) -> Formula:
+        formula = self.parse_or()
+        if self.accept("->"):
+            return ("implies", formula, self.parse_implies())
+        return formula
+
+    def parse_or(self) -> Formula:
+        formula = self.parse_and()
+        while self.accept("|"):
+            formula = ("or", formula, self.parse_and())
+        return formula
+
+    def parse_and(self) -> Formula:
+        formula = self.parse_until()
+        while self.accept("&"):
+            formula = ("and", formula, self.parse_until())
+        return formula
+
+    def parse_until(self) -> Formula:
+        formula = self.parse_unary()
+        if self.accept("U"):
+            return ("U", formula, self.parse_until())
+        return formula
+
+    def parse_unary(self) -> Formula:
+        if self.accept("!"):
+            return ("not", self.parse_unary())
+        for operator in ("X", "G", "F"):
+            if self.accept(operator):
+                return (operator, self.parse_unary())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Formula:
+        kind, value, position = self.peek()
+        if kind == "ap":
+            self.position += 1
+            return ("ap", value)
+        if kind == "const":
+            self.position += 1
+            return ("const", value == "true")
+        if self.accept("("):
+            formula = self.parse_iff()
+            if not self.accept(")"):
+                kind, value, position = self.peek()
+                if kind == "end":
+                    raise LTLSyntaxError("Missing closing parenthesis")
+                raise LTLSyntaxError(f"Expected ')' but found {value!r} at position {position}")
+            return formula
+        if kind == "end":
+            raise LTLSyntaxError("Unexpected end of formula")
+        raise LTLSyntaxError(f"Unexpected token {value!r} at position {position}")
+
+def atomic_propositions(formula: Formula) -> List[str]:
+    """Returns atomic propositions in order of first appearance"""
+    found = {}
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if node[0] == "ap":
+            found.setdefault(node[1], None)
+        elif node[0] != "const":
+            stack.extend(reversed(node[1:]))
+    return list(found)
+
+@lru_cache(maxsize=4096)
+def parse_ltl(formula: str) -> Formula:
+    """Parses a normalized formula; raises LTLSyntaxError on invalid input"""
+    return _Parser(tokenize(formula)).parse()
+
+@lru_cache(maxsize=4096)
+def _validate(normalized: str) -> Tuple[bool, Tuple[str, ...], str]:
+    try:
+        return True, tuple(atomic_propositions(parse_ltl(normalized))), ""
+    except LTLSyntaxError as e:
+        return False, (), str(e)
+
+def validate_formula(formula: str) -> Dict:
+    """Validates a formula locally, returning the same
+    {success, atomic_propositions, error} shape as the former remote service"""
+    success, propositions, error = _validate(normalize_formula(formula))
+    if success:
+        return {"success": True, "atomic_propositions": list(propositions)}
+    return {"success": False, "atomic_propositions": [], "error": error}
@@ -0,0 +1,150 @@
+from ..models import LTLResult, TranslationMatch
+from .monitor import WORD_PATTERN, _stem
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import threading
+import zlib
+
+# Only articles are dropped: prepositions and particles ("on"/"off", "in"/"on")
+# change what an instruction asks for
+ARTICLES = {"a", "an", "the"}
+MERSENNE_PRIME = (1 << 31) - 1
+
+def content_words(instruction: str) -> List[str]:
+    """Lowercased words without punctuation, articles and a leading 'to'"""
+    words = [word for word in WORD_PATTERN.findall(instruction.lower()) if word not in ARTICLES]
+    if words[:1] == ["to"]:
+        words = words[1:]
+    return words
+
+def normalize_instruction(instruction: str) -> str:
+    """content_words with plurals stemmed, so that 'To pick up the apples.' and
+    'pick up apple' normalize to the same text. Used for similarity only:
+    a plural can change the propositions of a formula."""
+    return " ".join(_stem(word) for word in content_words(instruction))
+
+def shingles(text: str, size: int = 4) -> FrozenSet[str]:
+    """Character n-grams of the normalized text; short texts are one shingle"""
+    if len(text) <= size:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+def similarity(a: str, b: str, shingle_size: int = 4) -> float:
+    """Similarity of two normalized instructions: the lower of the character
+    shingle and the word Jaccard similarity. Shingles tolerate small wording
+    changes, while words keep a single changed word such as 'on'/'off' from
+    scoring high in a long sentence."""
+    return min(jaccard(shingles(a, shingle_size), shingles(b, shingle_size)),
+               jaccard(frozenset(a.split()), frozenset(b.split())))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class MinHasher:
+    """MinHash signatures with num_perm universal hash functions over CRC32
+    shingle hashes. Seeded deterministically, so signatures are stable across
+    processes and runs."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        self.params: List[Tuple[int, int]] = []
+        state = seed
+        for _ in range(num_perm):
+            # A small LCG keeps the parameters independent of Python's random
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            a = (state >> 3) % (MERSENNE_PRIME - 1) + 1
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            b = (state >> 3) % MERSENNE_PRIME
+            self.params.append((a, b))
+
+    def signature(self, items: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(item.encode("utf-8")) % MERSENNE_PRIME for item in items]
+        if not hashes:
+            return (MERSENNE_PRIME,) * self.num_perm
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.params)
+
+class TranslationIndex:
+    """Near-duplicate index over validated instruction translations.
+
+    Candidates come from MinHash LSH (bands x rows = num_perm) over character
+    shingles and are ranked by similarity() to the stored instruction. lookup
+    returns the best candidate at or above seed_threshold. It is marked
+    reusable only when the similarity reaches reuse_threshold and both
+    instructions have the same content words in the same order, since one
+    changed object, plural or swapped pair of objects changes the formula;
+    otherwise callers use it as an example in the translation prompt.
+    """
+
+    def __init__(self, reuse_threshold: float = 0.9, seed_threshold: float = 0.6, num_perm: int = 64,
+                 bands: int = 16, shingle_size: int = 4):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if seed_threshold > reuse_threshold:
+            raise ValueError("seed_threshold must not exceed reuse_threshold")
+        self.reuse_threshold = reuse_threshold
+        self.seed_threshold = seed_threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        # (instruction, normalized text, exact key, result)
+        self.entries: List[Tuple[str, str, str, LTLResult]] = []
+        self.exact: Dict[str, int] = {}
+        self.buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(bands)]
+        # The signature of the last lookup, reused when that instruction is added
+        self._last_signature: Tuple[str, Tuple[int, ...]] = ("", ())
+        self._lock = threading.Lock()
+
+    def _signature(self, normalized: str) -> Tuple[int, ...]:
+        if self._last_signature[0] != normalized or not self._last_signature[1]:
+            self._last_signature = (normalized, self.hasher.signature(shingles(normalized, self.shingle_size)))
+        return self._last_signature[1]
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.bands)]
+
+    def add(self, instruction: str, result: LTLResult):
+        """Stores a validated translation; failed translations are ignored"""
+        if not result.success:
+            return
+        exact_key = " ".join(content_words(instruction))
+        normalized = normalize_instruction(instruction)
+        with self._lock:
+            if exact_key in self.exact:
+                return
+            entry_id = len(self.entries)
+            self.entries.append((instruction, normalized, exact_key, result))
+            self.exact[exact_key] = entry_id
+            for band, key in enumerate(self._band_keys(self._signature(normalized))):
+                self.buckets[band][key].append(entry_id)
+
+    def lookup(self, instruction: str) -> Optional[TranslationMatch]:
+        exact_key = " ".join(content_words(instruction))
+        normalized = normalize_instruction(instruction)
+        with self._lock:
+            if exact_key in self.exact:
+                best_id, best_similarity = self.exact[exact_key], 1.0
+            else:
+                candidates = set()
+                for band, key in enumerate(self._band_keys(self._signature(normalized))):
+                    candidates.update(self.buckets[band].get(key, ()))
+                best_id, best_similarity = None, 0.0
+                for entry_id in sorted(candidates):
+                    score = similarity(normalized, self.entries[entry_id][1], self.shingle_size)
+                    if score > best_similarity:
+                        best_id, best_similarity = entry_id, score
+            if best_id is None or best_similarity < self.seed_threshold:
+                return None
+            stored_instruction, _, stored_key, result = self.entries[best_id]
+        return TranslationMatch(
+            instruction=stored_instruction,
+            formula=result.formula,
+            atomic_propositions=list(result.atomic_propositions),
+            similarity=best_similarity,
+            reusable=best_similarity >= self.reuse_threshold and stored_key == exact_key
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -1,12 +1,24 @@
-from ..models import LTLResult
-from anthropic import Anthropic
-import requests
-from typing import Dict
+from ..models import LTLResult, TranslationMatch
+from ..llm.backend import AnthropicBackend, LLMBackend, LLMCaller
+from ..llm.cache import ResponseCache
+from ..llm.scheduler import PRIORITY_LTL
+from ..llm.usage import UsageTracker
+from ..utils.metrics import NULL_METRICS
+from .parser import validate_formula
+from typing import Dict, Optional
 
-class LTLTranslator:
-    def __init__(self, api_key: str, model: str = "claude-3-opus-20240229"):
-        self.client = Anthropic(api_key=api_key)
+class LTLTranslator(LLMCaller):
+    llm_stage = "ltl_generation"
+    llm_priority = PRIORITY_LTL
+
+    def __init__(self, api_key: str, model: str = "claude-3-opus-20240229",
+                 cache: Optional[ResponseCache] = None, metrics=None,
+                 backend: Optional[LLMBackend] = None):
+        self.backend = backend or AnthropicBackend(api_key)
         self.model = model
+        self.cache = cache
+        self.usage = UsageTracker()
+        self.metrics = metrics or NULL_METRICS
         self.base_prompt = """Translate the following natural language instruction into an LTL (Linear Temporal Logic) formula and explain your translation step by step.
 
 Key LTL operators:
@@ -39,18 +51,6 @@ Examples:
    LTL: START: G(enter_kitchen -> (check_fridge & (fridge_open -> X close_fridge))) FINISH.
    Explanation: Globally, when entering kitchen, check fridge and if it's open, close it in the next step."""
 
-    def generate_response(self, prompt: str) -> str:
-        try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                temperature=0,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            return message.content[0].text
-        except Exception as e:
-            raise Exception(f"Error generating response: {str(e)}")
-
     def extract_ltl_formula(self, claude_response: str) -> str:
         try:
             start_idx = claude_response.find("START:")
@@ -64,30 +64,38 @@ Examples:
             return ""
 
     def validate_ltl_formula(self, ltl_formula: str) -> Dict:
-        url = "http://45.86.180.122/formula/validate"
-        cleaned_formula = ltl_formula.replace("START:", "").replace("FINISH.", "").strip()
-        payload = {"formula_text": cleaned_formula}
-        try:
-            response = requests.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"success": False, "error": str(e)}
+        # Parsed in-process against the operator set allowed by the prompt;
+        # results are memoized per normalized formula
+        with self.metrics.timer("stage", stage="ltl_validation"):
+            result = validate_formula(ltl_formula)
+        if not result["success"]:
+            self.metrics.increment("ltl_validation_failures")
+        return result
 
-    def create_prompt(self, instruction: str, error: str = "") -> str:
-        prompt = self.base_prompt
+    def create_prompt_suffix(self, instruction: str, error: str = "",
+                             example: Optional[TranslationMatch] = None) -> str:
+        prompt = ""
+        if example is not None:
+            # A validated translation of a similar instruction, adapted rather
+            # than copied because the wording differs
+            prompt += ("A similar instruction was translated and validated before:\n"
+                       f"Instruction: \"{example.instruction}\"\n"
+                       f"LTL: {example.formula}\n"
+                       "Reuse its structure and propositions where they still apply.\n\n")
         if error:
-            prompt += f"\nConsider the following error in the previous formula: {error}\n"
-        prompt += f"\nPlease revise and translate the following instruction into a corrected LTL formula, following the syntax guidelines above:\n\n{instruction}"
+            prompt += f"Consider the following error in the previous formula: {error}\n\n"
+        prompt += f"Please revise and translate the following instruction into a corrected LTL formula, following the syntax guidelines above:\n\n{instruction}"
         return prompt
 
-    def translate_and_validate(self, instruction: str, error: str = "") -> LTLResult:
-        prompt = self.create_prompt(instruction, error)
-        response = self.generate_response(prompt)
+    def create_prompt(self, instruction: str, error: str = "", example: Optional[TranslationMatch] = None) -> str:
+        return self.base_prompt + "\n\n" + self.create_prompt_suffix(instruction, error, example)
+
+    def translate_and_validate(self, instruction: str, error: str = "",
+                               example: Optional[TranslationMatch] = None) -> LTLResult:
+        response = self.generate_response(
+            self.create_prompt_suffix(instruction, error, example),
+            system=self.base_prompt
+        )
         formula = self.extract_ltl_formula(response)
         validation_result = self.validate_ltl_formula(formula)
         
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List
 
 @dataclass
@@ -23,4 +23,28 @@ class WindowInfo:
     current_index: int
     previous_actions: List[str]
     next_actions: List[str]
-    full_window: List[str]
\ No newline at end of file
+    full_window: List[str]
+
+@dataclass
+class MonitorReport:
+    accepted: bool
+    verdicts: List[str]
+    violations: List[int]
+    irrelevant: List[int]
+    necessary: List[int]
+
+@dataclass
+class LLMResponse:
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+@dataclass
+class TranslationMatch:
+    instruction: str
+    formula: str
+    atomic_propositions: List[str]
+    similarity: float
+    # The stored translation can be used as is: the similarity reaches the
+    # reuse threshold and both instructions have the same content words in
+    # the same order
+    reusable: bool = False
\ No newline at end of file
@@ -1,28 +1,93 @@
-from ..models import ProcessingResult, WindowInfo
+from ..models import MonitorReport, ProcessingResult, WindowInfo
+from ..llm.backend import AnthropicBackend, LLMBackend, LLMCaller
+from ..llm.cache import ResponseCache
+from ..llm.usage import UsageTracker
+from ..utils.metrics import NULL_METRICS
+from ..utils.run_log import RunLogWriter, get_run_directory, get_run_log
+from ..ltl.monitor import LTLfMonitor, PropositionMapper
+from ..ltl.parser import LTLSyntaxError
+from .edits import apply_edit_script
+from .rules import Detector, detect
+from .structured_output import (COMPACT_RESPONSE_FORMAT, JSONObjectScanner, expand_compact_decision,
+                                validate_compact_decision)
 from rich.console import Console
 from rich.table import Table
-from datetime import datetime
-from anthropic import Anthropic
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import json
-import os
 
-class ContextWindowOptimizer:
+class ContextWindowOptimizer(LLMCaller):
+    llm_stage = "window_prompt"
+
     def __init__(self, api_key: str, look_back: int = 2, look_forward: int = 2, 
-                 model: str = "claude-3-opus-20240229"):
+                 model: str = "claude-3-opus-20240229", max_concurrency: int = 1,
+                 cache: Optional[ResponseCache] = None, skip_verified_windows: bool = False,
+                 proposition_mapper: Optional[PropositionMapper] = None, batch_size: int = 1,
+                 stride: Optional[int] = None, response_format: str = "full", metrics=None,
+                 log_dir: Optional[str] = None, verbose: bool = True,
+                 backend: Optional[LLMBackend] = None, rules: Optional[Sequence[Detector]] = None,
+                 max_passes: int = 1):
         self.look_back = look_back
         self.look_forward = look_forward
-        self.log_dir = self.create_log_directory()
+        # Every window is built from the original sequence, so window prompts
+        # are independent and can be sent concurrently.
+        self.max_concurrency = max(1, max_concurrency)
+        # One log directory and one background writer per run, shared by all
+        # optimizers of the process
+        self.log_dir = log_dir or get_run_directory()
+        self.run_log: RunLogWriter = get_run_log(self.log_dir)
+        self.verbose = verbose
         self.console = Console()
-        self.client = Anthropic(api_key=api_key)
+        self.backend = backend or AnthropicBackend(api_key)
         self.model = model
+        self.cache = cache
+        self.usage = UsageTracker()
+        self.metrics = metrics or NULL_METRICS
+        self.skip_verified_windows = skip_verified_windows
+        self.proposition_mapper = proposition_mapper
+        self._monitors: Dict[str, Optional[LTLfMonitor]] = {}
+        # With batch_size > 1 one prompt analyzes that many consecutive actions.
+        # A stride smaller than the batch size makes batches overlap.
+        self.batch_size = max(1, batch_size)
+        self.stride = min(max(1, stride or self.batch_size), self.batch_size)
+        # "compact" asks only for the decision fields and streams the response,
+        # closing the request as soon as the JSON object is complete
+        if response_format not in ("full", "compact"):
+            raise ValueError(f"Unknown response format: {response_format}")
+        self.response_format = response_format
+        # Deterministic detectors (see rules.py) that settle obvious cases
+        # before any window is sent to the model
+        self.rules = tuple(rules or ())
+        # With max_passes > 1 the edits are applied and the new plan analyzed
+        # again until nothing changes; only windows touched by an edit are re-sent
+        self.max_passes = max(1, max_passes)
 
     def create_log_directory(self) -> str:
-        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_dir = f"test_logs_{current_time}"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        return log_dir
+        return get_run_directory()
+
+    def log_step(self, result: Dict, total_steps: Optional[int], task: str, pass_number: int = 1,
+                 task_id: Optional[str] = None):
+        record = {
+            "task": task,
+            "step": result["action_index"] + 1,
+            "total_steps": total_steps,
+            "action": result["action"],
+            "window_info": result["window_info"]
+        }
+        if pass_number > 1:
+            record["pass"] = pass_number
+        # Goals are not unique across a dataset; the id keeps tasks apart
+        if task_id is not None:
+            record["task_id"] = task_id
+        if "analysis" in result:
+            record["analysis"] = result["analysis"]
+            record["source"] = result.get("source", "llm")
+        else:
+            record["error"] = result["error"]
+            record["raw_response"] = result.get("raw_response")
+        self.run_log.log("step", **record)
 
     def get_window_info(self, sequence: List[str], current_index: int) -> WindowInfo:
         start_idx = max(0, current_index - self.look_back)
@@ -37,33 +102,107 @@ class ContextWindowOptimizer:
             full_window=sequence[start_idx:end_idx]
         )
 
-    def create_context_prompt(self, window_info: WindowInfo, task: str, atomic_propositions: List[str]) -> str:
+    def create_context_prefix(self, task: str, atomic_propositions: List[str]) -> str:
+        # Static instructions come first, then the task and its propositions.
+        # The prefix is identical for every window of a plan, so it is sent as a
+        # cacheable system block and only the window suffix changes per call.
+        # It is cached by the provider only from MIN_CACHEABLE_TOKENS on; the
+        # built-in instructions alone are well below that.
+        if self.response_format == "compact":
+            response_format = COMPACT_RESPONSE_FORMAT
+        else:
+            response_format = """RESPOND EXACTLY IN THIS FORMAT:
+{
+    "window_analysis": {
+        "current_action": "the current action",
+        "window_range": {"start": number, "end": number},
+        "analyzed_window": ["previous, current and next actions"]
+    },
+    "position_analysis": {
+        "is_position_optimal": true/false,
+        "optimal_position": "before/after X action or current",
+        "reasoning": "Explain why the position should or should not change"
+    },
+    "necessity_analysis": {
+        "is_action_necessary": true/false,
+        "redundancy_reason": null or "Explain why action is redundant",
+        "missing_actions": [],
+        "reasoning": "Explain why action is necessary or redundant and why certain actions might be missing"
+    },
+    "optimization_decision": {
+        "decision": "keep/move/remove/augment",
+        "details": "Detailed explanation of the decision",
+        "suggested_changes": {
+            "position_change": null or "index:number",
+            "actions_to_add": [],
+            "remove_action": false
+        }
+    }
+}"""
+
         base_context = """You are a robotic action sequence optimizer. Analyze the current action in context of surrounding actions and the overall task to determine if any optimizations are needed.
 
+Each request gives the previous {look_back} actions, the current action and the next {look_forward} actions.
+
+Consider the following aspects:
+1. Is the current action in the right position relative to its context and the atomic propositions?
+2. Are there any missing actions needed between current and surrounding actions?
+3. Is this action redundant given the context and atomic propositions?
+4. Does this action align with the validated atomic propositions?
+
+{response_format}
+
 TASK:
 {task}
 
 ATOMIC PROPOSITIONS:
 The following atomic propositions have been validated for this task:
-{atomic_props}
+{atomic_props}"""
+
+        return base_context.format(
+            look_back=self.look_back,
+            look_forward=self.look_forward,
+            response_format=response_format,
+            task=task,
+            atomic_props=", ".join(atomic_propositions)
+        )
 
-CONTEXT:
+    def create_window_suffix(self, window_info: WindowInfo) -> str:
+        return """CONTEXT:
 Previous {look_back} actions: {prev_actions}
 Current action: {current}
 Next {look_forward} actions: {next_actions}
+Window range: start {start}, end {end}
+Analyzed window: {full_window}""".format(
+            look_back=self.look_back,
+            look_forward=self.look_forward,
+            prev_actions=json.dumps(window_info.previous_actions),
+            current=window_info.current_action,
+            next_actions=json.dumps(window_info.next_actions),
+            start=window_info.window_start,
+            end=window_info.window_end,
+            full_window=json.dumps(window_info.full_window)
+        )
 
-Consider the following aspects:
-1. Is the current action in the right position relative to its context and the atomic propositions?
-2. Are there any missing actions needed between current and surrounding actions?
+    def create_context_prompt(self, window_info: WindowInfo, task: str, atomic_propositions: List[str]) -> str:
+        return self.create_context_prefix(task, atomic_propositions) + "\n\n" + self.create_window_suffix(window_info)
+
+    def create_batch_prefix(self, task: str, atomic_propositions: List[str]) -> str:
+        base_context = """You are a robotic action sequence optimizer. Analyze each target action in context of surrounding actions and the overall task to determine if any optimizations are needed.
+
+For every target action consider the following aspects, using up to {look_back} previous and {look_forward} next actions as its window:
+1. Is the action in the right position relative to its context and the atomic propositions?
+2. Are there any missing actions needed between the action and surrounding actions?
 3. Is this action redundant given the context and atomic propositions?
 4. Does this action align with the validated atomic propositions?
 
-RESPOND EXACTLY IN THIS FORMAT:
+RESPOND EXACTLY WITH A JSON ARRAY CONTAINING ONE OBJECT PER TARGET ACTION, IN ORDER, EACH IN THIS FORMAT:
 {{
+    "action_index": index,
     "window_analysis": {{
-        "current_action": "{current}",
-        "window_range": {{"start": {start}, "end": {end}}},
-        "analyzed_window": {full_window}
+        "current_action": "action text",
+        "window_range": {{"start": number, "end": number}},
+        "analyzed_window": []
     }},
     "position_analysis": {{
         "is_position_optimal": true/false,
@@ -85,79 +224,467 @@ RESPOND EXACTLY IN THIS FORMAT:
             "remove_action": false
         }}
     }}
-}}"""
+}}
+
+TASK:
+{task}
+
+ATOMIC PROPOSITIONS:
+The following atomic propositions have been validated for this task:
+{atomic_props}"""
 
         return base_context.format(
             task=task,
             atomic_props=", ".join(atomic_propositions),
             look_back=self.look_back,
-            look_forward=self.look_forward,
-            prev_actions=json.dumps(window_info.previous_actions),
-            current=window_info.current_action,
-            next_actions=json.dumps(window_info.next_actions),
-            start=window_info.window_start,
-            end=window_info.window_end,
-            full_window=json.dumps(window_info.full_window)
+            look_forward=self.look_forward
         )
 
-    def generate_response(self, prompt: str) -> str:
-        try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                temperature=0,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            return message.content[0].text
-        except Exception as e:
-            raise Exception(f"Error generating response: {str(e)}")
+    def create_batch_suffix(self, sequence: List[str], indices: List[int]) -> str:
+        start = max(0, indices[0] - self.look_back)
+        end = min(len(sequence), indices[-1] + self.look_forward + 1)
+        context = "\n".join(f"{i}: {sequence[i]}" for i in range(start, end))
+        targets = "\n".join(f"{i}: {sequence[i]}" for i in indices)
+        return f"CONTEXT (index: action):\n{context}\n\nTARGET ACTIONS (index: action):\n{targets}"
+
+    def create_batch_prompt(self, sequence: List[str], indices: List[int], task: str,
+                            atomic_propositions: List[str]) -> str:
+        return self.create_batch_prefix(task, atomic_propositions) + "\n\n" + self.create_batch_suffix(sequence, indices)
+
+    def generate_response(self, prompt: str, max_tokens: int = 1024, stream_until_object: bool = False,
+                          system: Optional[str] = None) -> str:
+        if not stream_until_object:
+            return super().generate_response(prompt, max_tokens, system=system)
+        # The backend stops streaming once the decision object is complete
+        scanner = JSONObjectScanner()
+        response = super().generate_response(prompt, max_tokens, system=system, stop=scanner.feed)
+        return scanner.object_text or response
 
     def apply_sequence_optimizations(self, sequence: List[str], analysis_results: List[Dict]) -> List[str]:
-        optimized_sequence = sequence.copy()
-        modifications = []
-
-        for result in analysis_results:
-            if "analysis" in result:
-                decision = result["analysis"]["optimization_decision"]
-                changes = decision["suggested_changes"]
-                modifications.append({
-                    "index": result["action_index"],
-                    "action": result["action"],
-                    "decision": decision["decision"],
-                    "changes": changes
-                })
-
-        # Handle removals first
-        modifications_remove = [m for m in modifications if m["decision"] == "remove"]
-        for mod in reversed(modifications_remove):
-            if mod["changes"].get("remove_action", False):
-                del optimized_sequence[mod["index"]]
-
-        # Handle additions
-        modifications_add = [m for m in modifications if m["decision"] == "augment"]
-        for mod in modifications_add:
-            actions_to_add = mod["changes"].get("actions_to_add", [])
-            for action in actions_to_add:
-                optimized_sequence.insert(mod["index"], action)
-
-        # Handle moves last
-        modifications_move = [m for m in modifications if m["decision"] == "move"]
-        for mod in modifications_move:
-            position_change = mod["changes"].get("position_change")
-            if position_change:
-                try:
-                    current_index = optimized_sequence.index(mod["action"])
-                    new_index = int(position_change.split(":")[1])
-                    if new_index >= 0 and new_index < len(optimized_sequence):
-                        action = optimized_sequence.pop(current_index)
-                        optimized_sequence.insert(new_index, action)
-                except (ValueError, IndexError):
-                    continue
-
-        return optimized_sequence
-
-    def optimize_sequence(self, sequence: List[str], atomic_propositions: List[str], task: str) -> ProcessingResult:
-        results = []
+        return self._apply_edits(sequence, analysis_results)[0]
+
+    def _apply_edits(self, sequence: List[str],
+                     analysis_results: List[Dict]) -> Tuple[List[str], List[Optional[int]]]:
+        # Removals, additions and moves are resolved against the original
+        # indices in a single sorted pass (see edits.apply_edit_script). The
+        # origins map every optimized action back to its input index.
+        with self.metrics.timer("stage", stage="apply_optimizations"):
+            return apply_edit_script(sequence, analysis_results)
+
+    def get_monitor(self, ltl_formula: str) -> Optional[LTLfMonitor]:
+        if ltl_formula not in self._monitors:
+            try:
+                self._monitors[ltl_formula] = LTLfMonitor(ltl_formula, self.proposition_mapper)
+            except LTLSyntaxError:
+                self._monitors[ltl_formula] = None
+        return self._monitors[ltl_formula]
+
+    def create_monitor_analysis(self, window_info: WindowInfo) -> Dict:
+        details = ("LTLf monitor: the plan satisfies the formula and removing this action "
+                   "would violate it, so the action is kept without an LLM call")
+        return {
+            "window_analysis": {
+                "current_action": window_info.current_action,
+                "window_range": {"start": window_info.window_start, "end": window_info.window_end},
+                "analyzed_window": window_info.full_window
+            },
+            "position_analysis": {
+                "is_position_optimal": True,
+                "optimal_position": "current",
+                "reasoning": details
+            },
+            "necessity_analysis": {
+                "is_action_necessary": True,
+                "redundancy_reason": None,
+                "missing_actions": [],
+                "reasoning": details
+            },
+            "optimization_decision": {
+                "decision": "keep",
+                "details": details,
+                "suggested_changes": {
+                    "position_change": None,
+                    "actions_to_add": [],
+                    "remove_action": False
+                }
+            }
+        }
+
+    @staticmethod
+    def create_step(sequence: List[str], result: Dict) -> Dict:
+        """The optimization step of an analysis result, with the plan it was made on"""
+        index = result["action_index"]
+        if "analysis" in result:
+            return {
+                "step_number": index,
+                "current_action": sequence[index],
+                "window_info": result["window_info"],
+                "analysis_result": result["analysis"],
+                "current_sequence_state": sequence.copy()
+            }
+        return {
+            "step_number": index,
+            "error": result["error"],
+            "raw_response": result["raw_response"],
+            "current_sequence_state": sequence.copy()
+        }
+
+    def resolve_with_monitor(self, sequence: List[str], report: MonitorReport) -> Dict[int, Tuple[Dict, Dict]]:
+        resolved = {}
+        for i in report.necessary:
+            window_info = self.get_window_info(sequence, i)
+            result = {
+                "action_index": i,
+                "action": sequence[i],
+                "window_info": window_info,
+                "analysis": self.create_monitor_analysis(window_info),
+                "source": "ltl_monitor"
+            }
+            resolved[i] = (result, self.create_step(sequence, result))
+        return resolved
+
+    def resolve_with_rules(self, sequence: List[str], skip: Iterable[int] = ()) -> Dict[int, Tuple[Dict, Dict]]:
+        resolved = {}
+        for i, (rule, decision) in detect(sequence, self.rules, skip=list(skip)).items():
+            window_info = self.get_window_info(sequence, i)
+            analysis = expand_compact_decision(decision, window_info)
+            self.metrics.increment("rule_decisions", rule=rule, decision=decision["decision"])
+            result = {
+                "action_index": i,
+                "action": sequence[i],
+                "window_info": window_info,
+                "analysis": analysis,
+                "source": f"rule:{rule}"
+            }
+            resolved[i] = (result, self.create_step(sequence, result))
+        return resolved
+
+    def analyze_window_compact(self, window_info: WindowInfo, atomic_propositions: List[str], task: str) -> Dict:
+        response = self.generate_response(
+            self.create_window_suffix(window_info),
+            max_tokens=256,
+            stream_until_object=True,
+            system=self.create_context_prefix(task, atomic_propositions)
+        )
+        with self.metrics.timer("stage", stage="response_parsing"):
+            result = self.parse_compact_response(response, window_info)
+        if "error" in result:
+            self.metrics.increment("parse_failures", stage="window", reason=result["error_type"])
+        return result
+
+    def parse_compact_response(self, response: str, window_info: WindowInfo) -> Dict:
+        result = {
+            "action_index": window_info.current_index,
+            "action": window_info.current_action,
+            "window_info": window_info
+        }
+
+        scanner = JSONObjectScanner()
+        if not scanner.feed(response):
+            result.update(error="Response does not contain a complete JSON object",
+                          error_type="json", raw_response=response)
+            return result
+        try:
+            decision = json.loads(scanner.object_text)
+        except json.JSONDecodeError as e:
+            result.update(error=str(e), error_type="json", raw_response=response)
+            return result
+
+        errors = validate_compact_decision(decision)
+        if errors:
+            result.update(error=f"Schema validation failed: {'; '.join(errors)}",
+                          error_type="schema", raw_response=response)
+            return result
+
+        result["analysis"] = expand_compact_decision(decision, window_info)
+        return result
+
+    def analyze_window(self, window_info: WindowInfo, atomic_propositions: List[str], task: str) -> Dict:
+        if self.response_format == "compact":
+            return self.analyze_window_compact(window_info, atomic_propositions, task)
+
+        response = self.generate_response(
+            self.create_window_suffix(window_info),
+            system=self.create_context_prefix(task, atomic_propositions)
+        )
+        with self.metrics.timer("stage", stage="response_parsing"):
+            result = self.parse_window_response(response, window_info)
+        if "error" in result:
+            self.metrics.increment("parse_failures", stage="window", reason="json")
+        return result
+
+    def parse_window_response(self, response: str, window_info: WindowInfo) -> Dict:
+        try:
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            json_response = response[json_start:json_end]
+            analysis = json.loads(json_response)
+
+            return {
+                "action_index": window_info.current_index,
+                "action": window_info.current_action,
+                "window_info": window_info,
+                "analysis": analysis
+            }
+
+        except json.JSONDecodeError as e:
+            return {
+                "action_index": window_info.current_index,
+                "action": window_info.current_action,
+                "window_info": window_info,
+                "error": str(e),
+                "raw_response": response
+            }
+
+    def analyze_action(self, sequence: List[str], index: int, atomic_propositions: List[str],
+                       task: str) -> Tuple[Dict, Dict]:
+        window_info = self.get_window_info(sequence, index)
+        if self.verbose:
+            self.console.print(f"\n[bold blue]Analyzing action {index + 1}/{len(sequence)}: {sequence[index]}[/bold blue]")
+
+        result = self.analyze_window(window_info, atomic_propositions, task)
+        return result, self.create_step(sequence, result)
+
+    def optimize_stream(self, actions: Iterable[str], atomic_propositions: List[str],
+                        task: str, task_id: Optional[str] = None) -> Iterator[Dict]:
+        """Yields the analysis of each action, in order, as soon as its
+        look_forward context has arrived (or the stream has ended).
+
+        Only the current window and the analyses in flight are held in memory.
+        With max_concurrency > 1 window prompts run in the background while
+        further actions are consumed.
+        """
+        window_size = self.look_back + 1 + self.look_forward
+        buffer = deque(maxlen=window_size)
+        received = 0
+        next_index = 0
+        in_flight = deque()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency) if self.max_concurrency > 1 else None
+
+        def window_for(index: int) -> WindowInfo:
+            offset = received - len(buffer)
+            local = self.get_window_info(list(buffer), index - offset)
+            return replace(local, window_start=local.window_start + offset,
+                           window_end=local.window_end + offset, current_index=index)
+
+        def submit(index: int):
+            window_info = window_for(index)
+            if self.verbose:
+                self.console.print(f"\n[bold blue]Analyzing action {index + 1}: {window_info.current_action}[/bold blue]")
+            if executor is None:
+                in_flight.append(self.analyze_window(window_info, atomic_propositions, task))
+            else:
+                in_flight.append(executor.submit(self.analyze_window, window_info, atomic_propositions, task))
+
+        def completed(wait: bool) -> Iterator[Dict]:
+            while in_flight:
+                head = in_flight[0]
+                if executor is None:
+                    result = in_flight.popleft()
+                elif wait or head.done() or len(in_flight) >= self.max_concurrency:
+                    result = in_flight.popleft().result()
+                else:
+                    break
+                self.log_step(result, None, task, task_id=task_id)
+                yield result
+
+        try:
+            for action in actions:
+                buffer.append(action)
+                received += 1
+                while next_index + self.look_forward < received:
+                    submit(next_index)
+                    next_index += 1
+                yield from completed(wait=False)
+
+            while next_index < received:
+                submit(next_index)
+                next_index += 1
+            yield from completed(wait=True)
+        finally:
+            if executor is not None:
+                for future in in_flight:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+    def analyze_batch(self, sequence: List[str], indices: List[int], atomic_propositions: List[str],
+                      task: str) -> List[Tuple[Dict, Dict]]:
+        if self.verbose:
+            self.console.print(f"\n[bold blue]Analyzing actions {indices[0] + 1}-{indices[-1] + 1}/{len(sequence)}[/bold blue]")
+
+        response = self.generate_response(
+            self.create_batch_suffix(sequence, indices),
+            max_tokens=min(4096, 1024 * len(indices)),
+            system=self.create_batch_prefix(task, atomic_propositions)
+        )
+
+        analyses = {}
+        error = None
+        with self.metrics.timer("stage", stage="response_parsing"):
+            try:
+                json_start = response.find('[')
+                json_end = response.rfind(']') + 1
+                parsed = json.loads(response[json_start:json_end])
+                if not isinstance(parsed, list):
+                    raise json.JSONDecodeError("Expected a JSON array", response, 0)
+                for position, analysis in enumerate(parsed):
+                    if not isinstance(analysis, dict):
+                        continue
+                    # Fall back to array order when the model omits or garbles the index
+                    index = analysis.pop("action_index", None)
+                    if index not in indices:
+                        index = indices[position] if position < len(indices) else None
+                    if index is not None:
+                        analyses.setdefault(index, analysis)
+            except json.JSONDecodeError as e:
+                error = str(e)
+        missing = len([i for i in indices if i not in analyses])
+        if missing:
+            self.metrics.increment("parse_failures", missing, stage="batch",
+                                   reason="json" if error else "missing")
+
+        pairs = []
+        for i in indices:
+            window_info = self.get_window_info(sequence, i)
+            if i in analyses:
+                result = {
+                    "action_index": i,
+                    "action": sequence[i],
+                    "window_info": window_info,
+                    "analysis": analyses[i]
+                }
+            else:
+                result = {
+                    "action_index": i,
+                    "action": sequence[i],
+                    "window_info": window_info,
+                    "error": error or f"No analysis returned for action {i}",
+                    "raw_response": response
+                }
+            pairs.append((result, self.create_step(sequence, result)))
+        return pairs
+
+    def create_batches(self, indices: List[int]) -> List[List[int]]:
+        batches = []
+        for start in range(0, len(indices), self.stride):
+            batches.append(indices[start:start + self.batch_size])
+            if start + self.batch_size >= len(indices):
+                break
+        return batches
+
+    def analyze_actions(self, sequence: List[str], indices: List[int], atomic_propositions: List[str],
+                        task: str) -> List[Tuple[Dict, Dict]]:
+        if self.batch_size > 1:
+            units = self.create_batches(indices)
+            analyze = lambda batch: self.analyze_batch(sequence, batch, atomic_propositions, task)
+        else:
+            units = indices
+            analyze = lambda i: self.analyze_action(sequence, i, atomic_propositions, task)
+
+        if self.max_concurrency == 1 or len(units) <= 1:
+            outputs = [analyze(unit) for unit in units]
+        else:
+            workers = min(self.max_concurrency, len(units))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() yields in submission order, so results stay in index order
+                outputs = list(executor.map(analyze, units))
+
+        if self.batch_size == 1:
+            return outputs
+
+        # With overlapping batches keep, for every action, the analysis from the
+        # batch in which it sits closest to the middle and so has most context
+        best = {}
+        for batch, pairs in zip(units, outputs):
+            middle = (len(batch) - 1) / 2
+            for position, (i, pair) in enumerate(zip(batch, pairs)):
+                distance = abs(position - middle)
+                if i not in best or ("error" in best[i][1][0] and "error" not in pair[0]) or \
+                        (distance < best[i][0] and "error" not in pair[0]):
+                    best[i] = (distance, pair)
+        return [best[i][1] for i in indices]
+
+    @staticmethod
+    def window_key(window_info: WindowInfo) -> Tuple:
+        return (tuple(window_info.previous_actions), window_info.current_action, tuple(window_info.next_actions))
+
+    def reuse_analysis(self, sequence: List[str], index: int, earlier: Tuple[Dict, Dict]) -> Optional[Tuple[Dict, Dict]]:
+        """Carries an earlier "keep" analysis of an identical window over to
+        index. Other decisions refer to the plan they were made on and failed
+        analyses are retried, so those windows are analyzed again."""
+        result, _ = earlier
+        decision = (result.get("analysis", {}).get("optimization_decision") or {}).get("decision")
+        if decision != "keep":
+            return None
+        window_info = self.get_window_info(sequence, index)
+        analysis = dict(result["analysis"])
+        analysis["window_analysis"] = dict(analysis.get("window_analysis") or {},
+                                           window_range={"start": window_info.window_start,
+                                                         "end": window_info.window_end})
+        reused = dict(result, action_index=index, window_info=window_info, analysis=analysis, source="reused")
+        return reused, self.create_step(sequence, reused)
+
+    def analyze_pass(self, sequence: List[str], atomic_propositions: List[str], task: str,
+                     ltl_formula: Optional[str] = None,
+                     memo: Optional[Dict[Tuple, Tuple[Dict, Dict]]] = None) -> Tuple[List[Tuple[Dict, Dict]], Dict]:
+        """Analyzes every action of the sequence once. With a memo, windows
+        whose content was analyzed in an earlier pass are not sent again and
+        new LLM analyses are added to it. Returns the (result, step) pairs in
+        index order and what was analyzed, reused and resolved otherwise."""
+        resolved = {}
+        info = {"monitor_report": None, "analyzed": [], "reused": [], "resolved": []}
+        monitor = self.get_monitor(ltl_formula) if ltl_formula else None
+        if monitor is not None:
+            report = monitor.analyze(sequence)
+            info["monitor_report"] = report
+            if self.skip_verified_windows:
+                # Windows around actions the formula provably needs are not sent
+                resolved = self.resolve_with_monitor(sequence, report)
+        if self.rules:
+            # The monitor's verdicts take precedence over the rules
+            resolved.update(self.resolve_with_rules(sequence, skip=resolved))
+        info["resolved"] = sorted(resolved)
+
+        if memo is not None:
+            for i in range(len(sequence)):
+                earlier = memo.get(self.window_key(self.get_window_info(sequence, i))) if i not in resolved else None
+                pair = self.reuse_analysis(sequence, i, earlier) if earlier else None
+                if pair is not None:
+                    resolved[i] = pair
+                    info["reused"].append(i)
+
+        pending = [i for i in range(len(sequence)) if i not in resolved]
+        pairs = self.analyze_actions(sequence, pending, atomic_propositions, task)
+        if memo is not None:
+            for i, pair in zip(pending, pairs):
+                memo[self.window_key(self.get_window_info(sequence, i))] = pair
+        resolved.update(zip(pending, pairs))
+        info["analyzed"] = pending
+        return [resolved[i] for i in range(len(sequence))], info
+
+    @staticmethod
+    def describe_edits(sequence: List[str], origins: List[Optional[int]]) -> Dict[str, List[int]]:
+        """Summarizes one pass of apply_edit_script: the removed indices of the
+        input, the positions of inserted actions in the output and every output
+        position next to which something changed (len(output) when the tail
+        was cut). Windows covering an edited position see different context
+        in the next pass."""
+        kept = {origin for origin in origins if origin is not None}
+        edited = []
+        for j, origin in enumerate(origins):
+            expected = 0 if j == 0 else (origins[j - 1] + 1 if origins[j - 1] is not None else None)
+            if origin is None or origin != expected:
+                edited.append(j)
+        if sequence and origins[-1:] != [len(sequence) - 1]:
+            edited.append(len(origins))
+        return {
+            "removed": [i for i in range(len(sequence)) if i not in kept],
+            "inserted": [j for j, origin in enumerate(origins) if origin is None],
+            "edited_positions": edited
+        }
+
+    def optimize_sequence(self, sequence: List[str], atomic_propositions: List[str], task: str,
+                          ltl_formula: Optional[str] = None, task_id: Optional[str] = None) -> ProcessingResult:
         sequence_evolution = {
             "original_sequence": sequence,
             "steps": [],
@@ -165,53 +692,50 @@ RESPOND EXACTLY IN THIS FORMAT:
         }
 
         try:
-            for i in range(len(sequence)):
-                window_info = self.get_window_info(sequence, i)
-                self.console.print(f"\n[bold blue]Analyzing action {i + 1}/{len(sequence)}: {sequence[i]}[/bold blue]")
-                
-                prompt = self.create_context_prompt(window_info, task, atomic_propositions)
-                response = self.generate_response(prompt)
-                
-                try:
-                    json_start = response.find('{')
-                    json_end = response.rfind('}') + 1
-                    json_response = response[json_start:json_end]
-                    analysis = json.loads(json_response)
-
-                    results.append({
-                        "action_index": i,
-                        "action": sequence[i],
-                        "window_info": window_info,
-                        "analysis": analysis
-                    })
-
-                    sequence_evolution["steps"].append({
-                        "step_number": i,
-                        "current_action": sequence[i],
-                        "window_info": window_info,
-                        "analysis_result": analysis,
-                        "current_sequence_state": sequence.copy()
-                    })
-
-                except json.JSONDecodeError as e:
-                    error_info = {
-                        "action_index": i,
-                        "action": sequence[i],
-                        "window_info": window_info,
-                        "error": str(e),
-                        "raw_response": response
-                    }
-                    results.append(error_info)
-                    sequence_evolution["steps"].append({
-                        "step_number": i,
-                        "error": str(e),
-                        "raw_response": response,
-                        "current_sequence_state": sequence.copy()
-                    })
-
-            # Apply optimizations based on results
-            optimized_sequence = self.apply_sequence_optimizations(sequence, results)
-            
+            # Analyses by window content: after the first pass only windows an
+            # edit reached are new, so convergence costs calls per edit, not per pass
+            memo = {} if self.max_passes > 1 else None
+            passes = []
+            seen = {tuple(sequence)}
+            current = sequence
+            converged = False
+            for pass_number in range(1, self.max_passes + 1):
+                pairs, info = self.analyze_pass(current, atomic_propositions, task, ltl_formula, memo)
+                for i, (result, _) in enumerate(pairs):
+                    if pass_number == 1 or i not in info["reused"]:
+                        self.log_step(result, len(current), task, pass_number, task_id)
+                if pass_number == 1:
+                    sequence_evolution["steps"] = [step for _, step in pairs]
+                    if info["monitor_report"] is not None:
+                        sequence_evolution["monitor_report"] = info["monitor_report"]
+
+                optimized, origins = self._apply_edits(current, [result for result, _ in pairs])
+                passes.append(dict(
+                    {
+                        "pass": pass_number,
+                        "input_sequence": current,
+                        "output_sequence": optimized,
+                        "analyzed": info["analyzed"],
+                        "reused": info["reused"],
+                        "resolved": info["resolved"]
+                    },
+                    **self.describe_edits(current, origins)
+                ))
+                if pass_number > 1:
+                    self.metrics.increment("optimization_passes")
+                converged = optimized == current
+                # A plan seen before means the edits oscillate; stop there
+                cycled = not converged and tuple(optimized) in seen
+                seen.add(tuple(optimized))
+                current = optimized
+                if converged or cycled:
+                    break
+            optimized_sequence = current
+
+            if self.max_passes > 1:
+                sequence_evolution["passes"] = passes
+                sequence_evolution["converged"] = converged
+
             return ProcessingResult(
                 success=True,
                 data={
@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional, Tuple
+
+# Every element of the optimized sequence is placed by a sort key anchored to
+# an index of the original sequence, so edits never see shifted positions:
+#   (anchor, slot, kind, order)
+# slot 0 goes before the anchor, slot 1 is the anchor itself, slot 2 after it.
+BEFORE, AT, AFTER = 0, 1, 2
+INSERTED, MOVED = 0, 1
+
+def parse_position_change(position_change) -> Optional[int]:
+    """Reads the target index from 'index:N' (or a bare number)"""
+    if position_change is None or isinstance(position_change, bool):
+        return None
+    if isinstance(position_change, int):
+        return position_change
+    try:
+        return int(str(position_change).split(":")[-1].strip())
+    except ValueError:
+        return None
+
+def build_edit_script(sequence_length: int, analysis_results: List[Dict]) -> List[Tuple[Tuple[int, int, int, int], Optional[int], Optional[str]]]:
+    """Turns per-index optimization decisions into placement entries of the
+    form (sort_key, original_index, inserted_action)"""
+    decisions = {}
+    for result in analysis_results:
+        if "analysis" in result:
+            decision = result["analysis"].get("optimization_decision") or {}
+            decisions[result["action_index"]] = (decision.get("decision"), decision.get("suggested_changes") or {})
+
+    script = []
+    for index in range(sequence_length):
+        decision, changes = decisions.get(index, ("keep", {}))
+
+        if decision == "remove" and changes.get("remove_action", False):
+            continue
+
+        if decision == "augment":
+            for order, action in enumerate(changes.get("actions_to_add") or []):
+                script.append(((index, BEFORE, INSERTED, order), None, action))
+
+        target = parse_position_change(changes.get("position_change")) if decision == "move" else None
+        if target is None or target == index or not 0 <= target < sequence_length:
+            script.append(((index, AT, 0, 0), index, None))
+        elif target > index:
+            # Same result as popping the action and reinserting it at target
+            script.append(((target, AFTER, MOVED, index), index, None))
+        else:
+            script.append(((target, BEFORE, MOVED, index), index, None))
+
+    script.sort(key=lambda entry: entry[0])
+    return script
+
+def apply_edit_script(sequence: List[str], analysis_results: List[Dict]) -> Tuple[List[str], List[Optional[int]]]:
+    """Applies all decisions in one pass over the original indices.
+
+    Returns the optimized sequence and, for every element of it, the index it
+    came from in the original sequence (None for inserted actions). Because
+    actions are tracked by index, repeated action strings are handled
+    deterministically.
+    """
+    optimized = []
+    origins = []
+    for _, origin, inserted in build_edit_script(len(sequence), analysis_results):
+        optimized.append(sequence[origin] if origin is not None else inserted)
+        origins.append(origin)
+    return optimized, origins
@@ -0,0 +1,96 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import re
+
+# A detector maps a plan to the decisions it is certain about, keyed by
+# action index. Decisions use the compact format of structured_output and are
+# expanded to the full analysis schema by the optimizer.
+Detector = Callable[[List[str]], Dict[int, Dict]]
+
+NAVIGATION_VERBS = {"walk", "go", "run", "turn", "navigate", "head"}
+# Verbs whose repetition leaves the world as it was: moving to where the agent
+# already is or finding what it has already found. Repeating any other action
+# (Grab, Open, Put, Cut, ...) may be intended and is left to the model.
+IDEMPOTENT_VERBS = NAVIGATION_VERBS | {"find", "look"}
+OBJECT_FILLER = {"to", "toward", "towards", "the", "a", "an", "at", "into"}
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _words(action: str) -> List[str]:
+    return WORD_PATTERN.findall(action.lower())
+
+def _normalize(action: str) -> str:
+    return " ".join(_words(action))
+
+def _verb_and_object(action: str) -> Tuple[str, str]:
+    words = _words(action)
+    if not words:
+        return "", ""
+    return words[0], " ".join(word for word in words[1:] if word not in OBJECT_FILLER)
+
+def _is_navigation(action: str) -> bool:
+    return _verb_and_object(action)[0] in NAVIGATION_VERBS
+
+def _decision(decision: str, reason: str, position_change: Optional[str] = None) -> Dict:
+    return {
+        "decision": decision,
+        "position_change": position_change,
+        "actions_to_add": [],
+        "is_position_optimal": decision != "move",
+        "is_action_necessary": decision != "remove",
+        "reason": reason
+    }
+
+def consecutive_duplicates(sequence: List[str]) -> Dict[int, Dict]:
+    """Removes every repetition of the action directly before it, for
+    navigation and perception actions only"""
+    decisions = {}
+    for i in range(1, len(sequence)):
+        if (_normalize(sequence[i]) == _normalize(sequence[i - 1])
+                and _verb_and_object(sequence[i])[0] in IDEMPOTENT_VERBS):
+            decisions[i] = _decision("remove", f"Repeats the previous action '{sequence[i - 1]}'")
+    return decisions
+
+def navigation_loops(sequence: List[str]) -> Dict[int, Dict]:
+    """Removes the detour of A-B-A navigation, where B is reached and left
+    again without doing anything there"""
+    decisions = {}
+    i = 0
+    while i + 2 < len(sequence):
+        a, b, c = (_normalize(action) for action in sequence[i:i + 3])
+        if a == c and a != b and all(_is_navigation(action) for action in sequence[i:i + 3]):
+            reason = f"Navigates to '{sequence[i + 1]}' and straight back to '{sequence[i]}'"
+            decisions[i + 1] = _decision("remove", reason)
+            decisions[i + 2] = _decision("remove", reason)
+            i += 2
+        else:
+            i += 1
+    return decisions
+
+def find_walk_order(sequence: List[str]) -> Dict[int, Dict]:
+    """Moves 'Walk to X' directly after 'Find X' in front of it: the agent has
+    to reach an object before it can find it there. A run of repeated finds
+    is treated as one, so the walk lands before its first element whether or
+    not the repetitions are removed."""
+    decisions = {}
+    for i in range(len(sequence) - 1):
+        find_verb, found = _verb_and_object(sequence[i])
+        walk_verb, target = _verb_and_object(sequence[i + 1])
+        if find_verb == "find" and walk_verb in NAVIGATION_VERBS and found and found == target:
+            first = i
+            while first > 0 and _normalize(sequence[first - 1]) == _normalize(sequence[i]):
+                first -= 1
+            decisions[i + 1] = _decision("move", f"Walk to {target} before finding it", f"index:{first}")
+    return decisions
+
+DEFAULT_DETECTORS: Tuple[Detector, ...] = (consecutive_duplicates, navigation_loops, find_walk_order)
+
+def detect(sequence: List[str], detectors: Sequence[Detector] = DEFAULT_DETECTORS,
+           skip: Sequence[int] = ()) -> Dict[int, Tuple[str, Dict]]:
+    """Runs the detectors in order; the first decision for an index wins and
+    indices in skip are left alone. Returns index -> (detector name, decision)."""
+    resolved: Dict[int, Tuple[str, Dict]] = {}
+    skipped = set(skip)
+    for detector in detectors:
+        for index, decision in detector(sequence).items():
+            if index not in skipped and index not in resolved:
+                resolved[index] = (detector.__name__, decision)
+    return resolved
@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional
+from ..models import WindowInfo
+
+DECISIONS = ("keep", "move", "remove", "augment")
+
+COMPACT_RESPONSE_FORMAT = """RESPOND WITH ONLY THIS JSON OBJECT AND NOTHING ELSE:
+{"decision": "keep/move/remove/augment", "position_change": null or "index:number", "actions_to_add": [], "is_position_optimal": true/false, "is_action_necessary": true/false, "reason": "optional, at most one short sentence"}"""
+
+class JSONObjectScanner:
+    """Incrementally scans streamed text and reports when the first top-level
+    JSON object is complete, so a streaming request can be closed right away"""
+
+    def __init__(self):
+        self.buffer = []
+        self.start = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.length = 0
+        self.end = None
+
+    def feed(self, chunk: str) -> bool:
+        if self.end is not None:
+            return True
+        for offset, char in enumerate(chunk):
+            position = self.length + offset
+            if self.start is None:
+                if char == "{":
+                    self.start = position
+                    self.depth = 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = position + 1
+                    self.buffer.append(chunk[:offset + 1])
+                    self.length += offset + 1
+                    return True
+        self.buffer.append(chunk)
+        self.length += len(chunk)
+        return False
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.buffer)
+
+    @property
+    def object_text(self) -> Optional[str]:
+        if self.end is None:
+            return None
+        return self.text[self.start:self.end]
+
+def validate_compact_decision(decision) -> List[str]:
+    """Returns a list of schema violations (empty when the decision is valid)"""
+    if not isinstance(decision, dict):
+        return ["response is not a JSON object"]
+    errors = []
+    if decision.get("decision") not in DECISIONS:
+        errors.append(f"decision must be one of {', '.join(DECISIONS)}, got {decision.get('decision')!r}")
+    for field in ("is_position_optimal", "is_action_necessary"):
+        if field in decision and not isinstance(decision[field], bool):
+            errors.append(f"{field} must be a boolean")
+    actions_to_add = decision.get("actions_to_add", [])
+    if not isinstance(actions_to_add, list) or not all(isinstance(a, str) for a in actions_to_add):
+        errors.append("actions_to_add must be a list of strings")
+    position_change = decision.get("position_change")
+    if position_change is not None and not isinstance(position_change, (str, int)):
+        errors.append("position_change must be null or 'index:number'")
+    if decision.get("decision") == "move" and position_change is None:
+        errors.append("move decisions need a position_change")
+    if decision.get("decision") == "augment" and not actions_to_add:
+        errors.append("augment decisions need actions_to_add")
+    reason = decision.get("reason")
+    if reason is not None and not isinstance(reason, str):
+        errors.append("reason must be a string")
+    return errors
+
+def expand_compact_decision(decision: Dict, window_info: WindowInfo) -> Dict:
+    """Maps a validated compact decision onto the full analysis schema used by
+    apply_sequence_optimizations and the logging helpers"""
+    reason = decision.get("reason") or ""
+    remove = decision["decision"] == "remove"
+    return {
+        "window_analysis": {
+            "current_action": window_info.current_action,
+            "window_range": {"start": window_info.window_start, "end": window_info.window_end},
+            "analyzed_window": window_info.full_window
+        },
+        "position_analysis": {
+            "is_position_optimal": decision.get("is_position_optimal", decision["decision"] != "move"),
+            "optimal_position": decision.get("position_change") or "current",
+            "reasoning": reason
+        },
+        "necessity_analysis": {
+            "is_action_necessary": decision.get("is_action_necessary", not remove),
+            "redundancy_reason": reason if remove else None,
+            "missing_actions": decision.get("actions_to_add", []),
+            "reasoning": reason
+        },
+        "optimization_decision": {
+            "decision": decision["decision"],
+            "details": reason,
+            "suggested_changes": {
+                "position_change": decision.get("position_change"),
+                "actions_to_add": decision.get("actions_to_add", []),
+                "remove_action": remove
+            }
+        }
+    }
@@ -1,26 +1,82 @@
+from ..ltl.similarity_index import TranslationIndex
 from ..ltl.translator import LTLTranslator
 from ..optimization.context_window import ContextWindowOptimizer
+from ..optimization.rules import DEFAULT_DETECTORS
 from ..models import ProcessingResult, LTLResult
+from ..llm.backend import LLMBackend, create_backend
+from ..llm.cache import ResponseCache
+from ..utils.metrics import NULL_METRICS, MetricsRegistry
+from typing import Dict, List, Optional
 
 class ActionProcessor:
-    def __init__(self, api_key: str, look_back: int = 2, look_forward: int = 2):
+    def __init__(self, api_key: str, look_back: int = 2, look_forward: int = 2,
+                 max_concurrency: int = 1, cache_path: Optional[str] = None,
+                 cache_read_only: bool = False, skip_verified_windows: bool = False,
+                 batch_size: int = 1, stride: Optional[int] = None, response_format: str = "full",
+                 metrics: Optional[MetricsRegistry] = None, log_dir: Optional[str] = None,
+                 verbose: bool = True, backend: Optional[LLMBackend] = None, timeout: float = 60.0,
+                 record_path: Optional[str] = None, replay_path: Optional[str] = None,
+                 base_url: Optional[str] = None, reuse_translations: bool = False,
+                 reuse_threshold: float = 0.9, seed_threshold: float = 0.6, use_rules: bool = False,
+                 max_passes: int = 1):
         self.api_key = api_key
-        self.ltl_translator = LTLTranslator(api_key)
-        self.optimizer = ContextWindowOptimizer(api_key, look_back, look_forward)
+        # One backend, and with it one pooled HTTP client, for both components
+        self.backend = backend or create_backend(api_key, timeout=timeout, base_url=base_url,
+                                                 record_path=record_path, replay_path=replay_path)
+        # One cache shared by translation and window analysis
+        self.cache = ResponseCache(cache_path, read_only=cache_read_only) if cache_path else None
+        self.metrics = metrics or NULL_METRICS
+        self.ltl_translator = LTLTranslator(api_key, cache=self.cache, metrics=self.metrics,
+                                            backend=self.backend)
+        # Validated translations of earlier instructions, reused for near-duplicates
+        self.translation_index = TranslationIndex(reuse_threshold, seed_threshold) if reuse_translations else None
+        self.optimizer = ContextWindowOptimizer(api_key, look_back, look_forward,
+                                                max_concurrency=max_concurrency,
+                                                cache=self.cache,
+                                                skip_verified_windows=skip_verified_windows,
+                                                batch_size=batch_size, stride=stride,
+                                                response_format=response_format,
+                                                metrics=self.metrics,
+                                                log_dir=log_dir, verbose=verbose,
+                                                backend=self.backend,
+                                                rules=DEFAULT_DETECTORS if use_rules else None,
+                                                max_passes=max_passes)
 
-    def process_instruction(self, instruction: str, task: str, max_retries: int = 3) -> ProcessingResult:
-        # First, translate to LTL and get atomic propositions
-        ltl_result = self.ltl_translator.translate_and_validate(instruction)
+    def usage_summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "ltl_translation": self.ltl_translator.usage.summary(),
+            "window_analysis": self.optimizer.usage.summary()
+        }
+
+    def translate_instruction(self, instruction: str, max_retries: int = 3) -> LTLResult:
+        match = self.translation_index.lookup(instruction) if self.translation_index else None
+        if match is not None and match.reusable:
+            self.metrics.increment("ltl_index_hits", kind="reused")
+            return LTLResult(formula=match.formula, atomic_propositions=match.atomic_propositions, success=True)
+        if match is not None:
+            self.metrics.increment("ltl_index_hits", kind="seeded")
+
+        ltl_result = self.ltl_translator.translate_and_validate(instruction, example=match)
         
         retry_count = 0
         while not ltl_result.success and retry_count < max_retries:
             print(f"LTL validation failed. Retrying... (Attempt {retry_count + 1}/{max_retries})")
+            self.metrics.increment("ltl_retries")
             ltl_result = self.ltl_translator.translate_and_validate(
                 instruction, 
-                error=ltl_result.error
+                error=ltl_result.error,
+                example=match
             )
             retry_count += 1
 
+        if self.translation_index is not None:
+            self.translation_index.add(instruction, ltl_result)
+        return ltl_result
+
+    def process_instruction(self, instruction: str, task: str, max_retries: int = 3) -> ProcessingResult:
+        # First, translate to LTL and get atomic propositions
+        ltl_result = self.translate_instruction(instruction, max_retries)
+
         if not ltl_result.success:
             return ProcessingResult(
                 success=False,
@@ -35,5 +91,30 @@ class ActionProcessor:
         return self.optimizer.optimize_sequence(
             sequence=sequence,
             atomic_propositions=ltl_result.atomic_propositions,
-            task=task
-        )
\ No newline at end of file
+            task=task,
+            ltl_formula=ltl_result.formula
+        )
+
+    def verify_plan(self, sequence: List[str], task: str, max_retries: int = 3,
+                    task_id: Optional[str] = None) -> ProcessingResult:
+        # Plans from the datasets are already split into steps, so the task
+        # itself is translated to LTL instead of the joined instruction
+        ltl_result = self.translate_instruction(task, max_retries)
+
+        if not ltl_result.success:
+            return ProcessingResult(
+                success=False,
+                data={},
+                error="Failed to generate valid LTL formula"
+            )
+
+        result = self.optimizer.optimize_sequence(
+            sequence=sequence,
+            atomic_propositions=ltl_result.atomic_propositions,
+            task=task,
+            ltl_formula=ltl_result.formula,
+            task_id=task_id
+        )
+        if result.success:
+            result.data["ltl_formula"] = ltl_result.formula
+        return result
\ No newline at end of file
@@ -0,0 +1,264 @@
+from ..data.columnar import ColumnarDataset, default_cache_dir
+from ..llm.scheduler import configure_scheduler
+from ..utils.metrics import MetricsRegistry
+from ..utils.run_log import close_run_logs, get_run_directory, to_jsonable
+from .action_processor import ActionProcessor
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from itertools import chain, islice
+from multiprocessing.util import Finalize
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+import argparse
+import json
+import os
+import time
+
+_processor: Optional[ActionProcessor] = None
+
+def load_completed_task_ids(output_path: str) -> Set[str]:
+    """Reads task ids that already have a result line in the output file"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                completed.add(json.loads(line)["task_id"])
+            except (json.JSONDecodeError, KeyError):
+                # A crash can leave a truncated last line; that task is rerun
+                continue
+    return completed
+
+def truncate_partial_line(output_path: str):
+    """Cuts off a last line without its newline, left by a crash mid-write, so
+    that appended records start on a line of their own"""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            size = min(4096, position)
+            f.seek(position - size)
+            newline = f.read(size).rfind(b"\n")
+            if newline >= 0:
+                position = position - size + newline + 1
+                break
+            position -= size
+        if position < end:
+            f.truncate(position)
+
+def _init_worker(api_key: str, processor_options: Dict, collect_metrics: bool, scheduler_options: Dict):
+    global _processor
+    configure_scheduler(**scheduler_options)
+    metrics = MetricsRegistry() if collect_metrics else None
+    _processor = ActionProcessor(api_key, metrics=metrics, **processor_options)
+    # Pool workers skip atexit handlers; this flushes the run log on shutdown
+    Finalize(None, close_run_logs, exitpriority=10)
+
+def _verify_task(task: Dict, max_retries: int) -> Dict:
+    started = time.perf_counter()
+    record = {
+        "task_id": task["task_id"],
+        "split": task["split"],
+        "goal": task["goal"],
+        "original_sequence": task["steps"]
+    }
+    usage_before = _processor.usage_summary()
+    _processor.metrics.begin_task(task["task_id"])
+    try:
+        result = _processor.verify_plan(task["steps"], task["goal"], max_retries=max_retries,
+                                        task_id=task["task_id"])
+        record.update({
+            "success": result.success,
+            "error": result.error,
+            "ltl_formula": result.data.get("ltl_formula"),
+            "optimized_sequence": result.data.get("optimized_sequence"),
+            "optimization_steps": result.data.get("optimization_steps")
+        })
+    except Exception as e:
+        record.update({"success": False, "error": str(e)})
+    if _processor.metrics.enabled:
+        record["metrics"] = _processor.metrics.end_task()
+    # Trackers are cumulative per worker, so the task's share is the difference
+    record["token_usage"] = {
+        stage: {field: value - usage_before[stage][field] for field, value in totals.items()}
+        for stage, totals in _processor.usage_summary().items()
+    }
+    record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+# Tasks queued per worker, enough to keep every worker busy between results
+TASKS_IN_FLIGHT_PER_WORKER = 4
+
+def submit_bounded(executor: Executor, fn: Callable, items: Iterable, max_in_flight: int, *args) -> Iterator:
+    """Yields fn(item, *args) for every item in completion order, submitting
+    the next item only when fewer than max_in_flight are running or queued.
+    items is consumed lazily, so it can be a stream of any length."""
+    items = iter(items)
+    in_flight = set()
+    while True:
+        for item in islice(items, max_in_flight - len(in_flight)):
+            in_flight.add(executor.submit(fn, item, *args))
+        if not in_flight:
+            return
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+class BatchRunner:
+    def __init__(self, api_key: str, output_path: str, workers: int = 4, max_retries: int = 3,
+                 collect_metrics: bool = False, scheduler_options: Optional[Dict] = None,
+                 max_in_flight: Optional[int] = None, **processor_options):
+        # processor_options are forwarded to the ActionProcessor of every worker
+        self.api_key = api_key
+        self.output_path = output_path
+        self.workers = max(1, workers)
+        self.max_in_flight = max(1, max_in_flight or self.workers * TASKS_IN_FLIGHT_PER_WORKER)
+        self.max_retries = max_retries
+        self.collect_metrics = collect_metrics
+        # Per-task metrics of all workers, merged as their results arrive
+        self.metrics = MetricsRegistry() if collect_metrics else None
+        # Every worker has its own scheduler, so the rate budgets are split evenly
+        self.scheduler_options = dict(scheduler_options or {})
+        for budget in ("requests_per_minute", "tokens_per_minute"):
+            if self.scheduler_options.get(budget):
+                self.scheduler_options[budget] /= self.workers
+        # Workers share this run's log directory and log to it instead of the console
+        processor_options.setdefault("log_dir", get_run_directory())
+        processor_options.setdefault("verbose", False)
+        self.processor_options = processor_options
+
+    def pending_tasks(self, tasks: Iterable[Dict]) -> Iterator[Dict]:
+        completed = load_completed_task_ids(self.output_path)
+        return (task for task in tasks if task["task_id"] not in completed)
+
+    def run(self, tasks: Iterable[Dict]) -> Dict[str, int]:
+        """Verifies tasks as they are drawn from the iterable; only
+        max_in_flight of them are held at a time."""
+        truncate_partial_line(self.output_path)
+        stats = {"submitted": 0, "succeeded": 0, "failed": 0}
+        pending = self.pending_tasks(tasks)
+        first = next(pending, None)
+        if first is None:
+            return stats
+
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with open(self.output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.api_key, self.processor_options, self.collect_metrics, self.scheduler_options)
+        ) as executor:
+            for record in submit_bounded(executor, _verify_task, chain([first], pending),
+                                         self.max_in_flight, self.max_retries):
+                # One line per finished task, flushed so a crash loses at most
+                # the tasks still in flight
+                out.write(json.dumps(record, ensure_ascii=False, default=to_jsonable) + "\n")
+                out.flush()
+                if self.metrics is not None and "metrics" in record:
+                    self.metrics.merge(record["metrics"])
+                stats["submitted"] += 1
+                stats["succeeded" if record["success"] else "failed"] += 1
+
+        return stats
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Verify every plan of one or more datasets")
+    parser.add_argument("datasets", nargs="+", help="alfred_tasks.json, vh_tasks.json or alfred_tasks.csv files")
+    parser.add_argument("--output", required=True, help="JSONL file with one result per task")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=1)
+    parser.add_argument("--look-back", type=int, default=2)
+    parser.add_argument("--look-forward", type=int, default=2)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--cache", default=None, help="SQLite file caching LLM responses across runs")
+    parser.add_argument("--cache-read-only", action="store_true")
+    parser.add_argument("--skip-verified-windows", action="store_true",
+                        help="Keep actions the LTLf monitor proves necessary without an LLM call")
+    parser.add_argument("--batch-size", type=int, default=1, help="Actions analyzed per prompt")
+    parser.add_argument("--stride", type=int, default=None, help="Step between batches, defaults to the batch size")
+    parser.add_argument("--response-format", choices=["full", "compact"], default="full",
+                        help="compact requests only the decision fields and stops streaming once they are complete")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Add per-task stage timings, token counts and retry counters to every result line")
+    parser.add_argument("--metrics-json", default=None,
+                        help="Write the metrics of the whole run to this JSON file (implies --metrics)")
+    parser.add_argument("--metrics-prometheus", default=None,
+                        help="Write the metrics of the whole run in Prometheus text format (implies --metrics)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds before an LLM request times out")
+    parser.add_argument("--record", default=None,
+                        help="Append every LLM response to this JSONL file for later replay; "
+                             "a directory (e.g. recordings/) gets one file per worker")
+    parser.add_argument("--replay", default=None,
+                        help="Serve LLM responses from a recording instead of the API")
+    parser.add_argument("--rules", action="store_true",
+                        help="Settle repeated navigation and find actions, navigation loops and find/walk order without the LLM")
+    parser.add_argument("--max-passes", type=int, default=1,
+                        help="Re-analyze the edited plan until it stops changing, at most this many passes")
+    parser.add_argument("--reuse-translations", action="store_true",
+                        help="Reuse the LTL translation of a near-identical earlier goal instead of calling the LLM")
+    parser.add_argument("--base-url", default=None, help="Send requests to this API endpoint, e.g. a fake server")
+    parser.add_argument("--requests-per-minute", type=float, default=None,
+                        help="Request budget of the whole run, split evenly across workers")
+    parser.add_argument("--tokens-per-minute", type=float, default=None,
+                        help="Token budget of the whole run, split evenly across workers")
+    parser.add_argument("--llm-retries", type=int, default=4, help="Retries of throttled or failed LLM requests")
+    parser.add_argument("--hedge-after", type=float, default=None,
+                        help="Start a second copy of a request still running after this many seconds")
+    parser.add_argument("--split", default=None, help="Only verify tasks of this split, e.g. valid_seen")
+    parser.add_argument("--dataset-cache", default=default_cache_dir(),
+                        help="Directory for the parsed columnar copies of the datasets")
+    parser.add_argument("--limit", type=int, default=None, help="Only take the first N tasks of each dataset")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    # Each dataset is parsed once into a memory-mapped columnar store, reused
+    # while the file is unchanged, and its tasks are read as workers free up
+    tasks = chain.from_iterable(
+        islice(ColumnarDataset.open(path, cache_dir=args.dataset_cache).iter_tasks(args.split), args.limit)
+        for path in args.datasets
+    )
+
+    runner = BatchRunner(
+        api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+        output_path=args.output,
+        workers=args.workers,
+        max_retries=args.max_retries,
+        collect_metrics=args.metrics or bool(args.metrics_json or args.metrics_prometheus),
+        scheduler_options={
+            "requests_per_minute": args.requests_per_minute,
+            "tokens_per_minute": args.tokens_per_minute,
+            "max_retries": args.llm_retries,
+            "hedge_after": args.hedge_after
+        },
+        look_back=args.look_back,
+        look_forward=args.look_forward,
+        max_concurrency=args.max_concurrency,
+        cache_path=args.cache,
+        cache_read_only=args.cache_read_only,
+        skip_verified_windows=args.skip_verified_windows,
+        batch_size=args.batch_size,
+        stride=args.stride,
+        response_format=args.response_format,
+        timeout=args.timeout,
+        record_path=args.record,
+        replay_path=args.replay,
+        base_url=args.base_url,
+        reuse_translations=args.reuse_translations,
+        use_rules=args.rules,
+        max_passes=args.max_passes
+    )
+    stats = runner.run(tasks)
+    print(f"Submitted {stats['submitted']} tasks: {stats['succeeded']} succeeded, {stats['failed']} failed")
+    if runner.metrics is not None:
+        runner.metrics.write(args.metrics_json, args.metrics_prometheus)
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,26 @@
-from datetime import datetime
 from typing import Dict, List
 from rich.console import Console
 from rich.table import Table
+from .run_log import get_run_directory, get_run_log, load_steps
 import json
 import os
 
 console = Console()
 
 def create_log_directory() -> str:
-    """Creates a directory for logs with current date and time"""
-    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_dir = f"test_logs_{current_time}"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    return log_dir
+    """Returns the log directory of the current run (created once per process)"""
+    return get_run_directory()
 
 def save_analysis_results(log_dir: str, step_index: int, window_info: Dict, 
                          raw_response: str, processed_result: Dict):
-    """Saves detailed information about each analysis step"""
-    filename = f"step_{step_index}_analysis.json"
-    filepath = os.path.join(log_dir, filename)
-    
-    analysis_data = {
-        "step_info": {
-            "step_number": step_index,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        },
-        "window_analysis": window_info,
-        "raw_model_response": raw_response,
-        "processed_analysis": processed_result
-    }
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(analysis_data, f, indent=2, ensure_ascii=False)
+    """Appends detailed information about an analysis step to the run log"""
+    get_run_log(log_dir).log(
+        "analysis",
+        step_number=step_index,
+        window_analysis=window_info,
+        raw_model_response=raw_response,
+        processed_analysis=processed_result
+    )
 
 def print_sequence_comparison(original_sequence: List[str], optimized_sequence: List[str]):
     """Prints a comparative table of sequences"""
@@ -87,4 +75,19 @@ def print_analysis_result(action: str, analysis: Dict, step: int, total_steps: i
         console.print(f"│ Action necessary: {analysis['necessity_analysis']['is_action_necessary']}")
         console.print(f"│ Decision: {decision['decision']}")
         console.print(f"│ Details: {decision['details']}")
-    console.print("╰" + "─" * 105 + "╯")
\ No newline at end of file
+    console.print("╰" + "─" * 105 + "╯")
+
+def replay_run_log(path: str, task: str = None, task_id: str = None):
+    """Prints the window and analysis views of logged steps, as shown live by print_window_info/print_analysis_result"""
+    current_task = None
+    for record in load_steps(path, task, task_id):
+        if (record.get("task_id"), record.get("task")) != current_task:
+            current_task = (record.get("task_id"), record.get("task"))
+            heading = f"{current_task[0]}: {current_task[1]}" if current_task[0] else current_task[1]
+            console.print(f"\n[bold]{heading}[/bold]")
+        # Streamed steps are logged before the plan length is known
+        total_steps = record["total_steps"] or "?"
+        print_window_info(record["window_info"], record["step"], total_steps)
+        print_analysis_result(record["action"], record.get("analysis") or {}, record["step"], total_steps)
+        if "error" in record:
+            console.print(f"│ Error: {record['error']}")
\ No newline at end of file
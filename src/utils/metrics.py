@@ -0,0 +1,241 @@
+from ..llm.usage import usage_to_dict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, counts: List[int], total: float):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.total += total
+        self.count += sum(counts)
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            # Per-bucket counts (LATENCY_BUCKETS, then +Inf) so summaries can be merged
+            "buckets": list(self.counts)
+        }
+
+class _Scope:
+    def __init__(self):
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], _Histogram] = {}
+
+    def increment(self, name: str, labels: LabelKey, value: float):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name: str, labels: LabelKey) -> _Histogram:
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = _Histogram()
+        return histogram
+
+    def observe(self, name: str, labels: LabelKey, value: float):
+        self.histogram(name, labels).observe(value)
+
+    def merge(self, summary: Dict[str, List[Dict]]):
+        for counter in summary.get("counters", []):
+            self.increment(counter["name"], _label_key(counter["labels"]), counter["value"])
+        for timer in summary.get("timers", []):
+            self.histogram(timer["name"], _label_key(timer["labels"])).merge(timer["buckets"], timer["sum"])
+
+    def summary(self) -> Dict[str, List[Dict]]:
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            "timers": [
+                dict({"name": name, "labels": dict(labels)}, **histogram.summary())
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        }
+
+class MetricsRegistry:
+    """Counters and latency histograms for the verification hot path.
+
+    Everything is recorded globally and, between begin_task/end_task, also
+    for the current task, whose scope end_task returns and discards. Task
+    summaries from other processes can be merged into the global scope.
+    Exported as a JSON summary or Prometheus text.
+    """
+
+    enabled = True
+
+    def __init__(self, namespace: str = "verifyllm"):
+        self.namespace = namespace
+        self._global = _Scope()
+        self._tasks: Dict[str, _Scope] = {}
+        self._current_task: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def begin_task(self, task_id: str):
+        with self._lock:
+            self._current_task = task_id
+            self._tasks.setdefault(task_id, _Scope())
+
+    def end_task(self) -> Dict[str, List[Dict]]:
+        with self._lock:
+            scope = self._tasks.pop(self._current_task, None)
+            self._current_task = None
+            return scope.summary() if scope else {"counters": [], "timers": []}
+
+    def merge(self, summary: Dict[str, List[Dict]]):
+        """Adds a summary returned by end_task, e.g. by a worker process"""
+        with self._lock:
+            self._global.merge(summary)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._global.increment(name, key, value)
+            if self._current_task is not None:
+                self._tasks[self._current_task].increment(name, key, value)
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._global.observe(name, key, value)
+            if self._current_task is not None:
+                self._tasks[self._current_task].observe(name, key, value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def record_usage(self, stage: str, usage, cached_response: bool = False):
+        if cached_response:
+            self.increment("response_cache_hits", stage=stage)
+            return
+        for kind, value in usage_to_dict(usage).items():
+            if value:
+                self.increment("tokens", value, stage=stage, kind=kind)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "global": self._global.summary(),
+                "tasks": {task_id: scope.summary() for task_id, scope in self._tasks.items()}
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._global.counters})
+            for name in counter_names:
+                metric = f"{self.namespace}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in sorted(self._global.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+            histogram_names = sorted({name for name, _ in self._global.histograms})
+            for name in histogram_names:
+                metric = f"{self.namespace}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), histogram in sorted(self._global.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                f.write(self.to_json())
+        if prometheus_path:
+            with open(prometheus_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class NullMetrics:
+    """Drop-in registry that records nothing; used when metrics are disabled"""
+
+    enabled = False
+
+    def begin_task(self, task_id: str):
+        pass
+
+    def end_task(self) -> Dict[str, List[Dict]]:
+        return {"counters": [], "timers": []}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def timer(self, name: str, **labels) -> _NullTimer:
+        return _NULL_TIMER
+
+    def record_usage(self, stage: str, usage, cached_response: bool = False):
+        pass
+
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,143 @@
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+
+_STOP = object()
+_run_directory: Optional[str] = None
+_writers: Dict[str, "RunLogWriter"] = {}
+_writers_lock = threading.Lock()
+
+def to_jsonable(value):
+    """Converts dataclasses nested in results into plain JSON values"""
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def get_run_directory(base_dir: str = ".") -> str:
+    """Returns the log directory of the current run, creating it on first use.
+
+    All optimizers of a process share it instead of creating their own.
+    """
+    global _run_directory
+    if _run_directory is None:
+        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+        _run_directory = os.path.join(base_dir, f"test_logs_{current_time}")
+        os.makedirs(_run_directory, exist_ok=True)
+    return _run_directory
+
+class RunLogWriter:
+    """Append-only, gzip-compressed JSONL log written by a background thread.
+
+    log() only enqueues; when the bounded queue is full it blocks, so a slow
+    disk applies back-pressure instead of growing memory. Every writer
+    appends a new gzip member, so a file can be reopened across runs.
+    Records that cannot be serialized are reported and dropped; after a write
+    error the writer stops and later records are dropped.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10_000):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="run-log-writer", daemon=True)
+        self._closed = False
+        self.dropped = 0
+        self.error: Optional[Exception] = None
+        self._thread.start()
+
+    def log(self, event: str, **payload):
+        if self._closed:
+            return
+        record = {"event": event, "timestamp": datetime.now().isoformat(timespec="milliseconds")}
+        record.update(payload)
+        while True:
+            try:
+                self._queue.put(record, timeout=1.0)
+                return
+            except queue.Full:
+                # Only a stopped writer leaves the queue full for good
+                if not self._thread.is_alive():
+                    self.dropped += 1
+                    return
+
+    def _run(self):
+        try:
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                while True:
+                    record = self._queue.get()
+                    if record is _STOP:
+                        break
+                    try:
+                        line = json.dumps(record, ensure_ascii=False, default=to_jsonable)
+                    except (TypeError, ValueError) as e:
+                        self.dropped += 1
+                        print(f"Run log: dropped a {record.get('event')} record: {e}", file=sys.stderr)
+                        continue
+                    f.write(line + "\n")
+                    if self._queue.empty():
+                        f.flush()
+        except OSError as e:
+            self.error = e
+            self._closed = True
+            print(f"Run log: writing {self.path} failed, further records are dropped: {e}", file=sys.stderr)
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+def get_run_log(log_dir: str) -> RunLogWriter:
+    """Returns the process-wide writer for a log directory"""
+    path = os.path.join(log_dir, f"run_{os.getpid()}.jsonl.gz")
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = RunLogWriter(path)
+        return writer
+
+@atexit.register
+def close_run_logs():
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
+
+def read_run_log(path: str) -> Iterator[Dict]:
+    """Yields the records of one log file, or of every run_*.jsonl.gz file in
+    a log directory. A truncated tail left by a crash is ignored."""
+    paths = sorted(glob.glob(os.path.join(path, "run_*.jsonl.gz"))) if os.path.isdir(path) else [path]
+    for file_path in paths:
+        try:
+            with gzip.open(file_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+        except EOFError:
+            continue
+
+def load_steps(path: str, task: Optional[str] = None, task_id: Optional[str] = None) -> List[Dict]:
+    """Returns the logged per-step records, optionally only those of one task
+    id and/or goal text. Several tasks can share a goal, so use task_id where
+    the steps were logged with one."""
+    return [record for record in read_run_log(path)
+            if record["event"] == "step" and (task is None or record.get("task") == task)
+            and (task_id is None or record.get("task_id") == task_id)]
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from src.pipeline.batch_runner import load_completed_task_ids, submit_bounded, truncate_partial_line
+import json
+import threading
+import time
+
+def test_truncated_tail_is_cut_before_appending(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"task_id": "a:0", "success": True}) + "\n" + '{"task_id": "a:1", "succ',
+                      encoding="utf-8")
+    assert load_completed_task_ids(str(output)) == {"a:0"}
+
+    truncate_partial_line(str(output))
+    with open(output, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"task_id": "a:1", "success": True}) + "\n")
+    assert load_completed_task_ids(str(output)) == {"a:0", "a:1"}
+
+def test_complete_files_are_left_alone(tmp_path):
+    output = tmp_path / "results.jsonl"
+    content = "".join(json.dumps({"task_id": f"a:{i}"}) + "\n" for i in range(3))
+    output.write_text(content, encoding="utf-8")
+    truncate_partial_line(str(output))
+    assert output.read_text(encoding="utf-8") == content
+
+def test_single_partial_line_is_removed(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"task_id": "a:0"', encoding="utf-8")
+    truncate_partial_line(str(output))
+    assert output.read_text(encoding="utf-8") == ""
+    truncate_partial_line(str(tmp_path / "missing.jsonl"))
+
+def test_submit_bounded_draws_tasks_lazily():
+    lock = threading.Lock()
+    state = {"drawn": 0, "running": 0, "peak": 0, "ahead": 0}
+
+    def tasks():
+        for i in range(50):
+            with lock:
+                state["drawn"] += 1
+            yield i
+
+    def verify(task: int, offset: int) -> int:
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.002)
+        with lock:
+            state["running"] -= 1
+        return task + offset
+
+    results = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for result in submit_bounded(executor, verify, tasks(), 3, 100):
+            with lock:
+                state["ahead"] = max(state["ahead"], state["drawn"] - len(results))
+            results.append(result)
+
+    assert sorted(results) == list(range(100, 150))
+    assert state["peak"] <= 3
+    assert state["ahead"] <= 3
@@ -0,0 +1,60 @@
+from src.optimization.edits import apply_edit_script
+import random
+import time
+
+def decision(index: int, kind: str, position_change=None, actions_to_add=()) -> dict:
+    return {
+        "action_index": index,
+        "analysis": {
+            "optimization_decision": {
+                "decision": kind,
+                "suggested_changes": {
+                    "position_change": position_change,
+                    "actions_to_add": list(actions_to_add),
+                    "remove_action": kind == "remove"
+                }
+            }
+        }
+    }
+
+def test_duplicate_actions_are_edited_by_index():
+    sequence = ["Walk to table", "Grab cup", "Walk to table", "Grab cup"]
+    optimized, origins = apply_edit_script(sequence, [decision(2, "remove")])
+    assert optimized == ["Walk to table", "Grab cup", "Grab cup"]
+    assert origins == [0, 1, 3]
+
+    optimized, origins = apply_edit_script(sequence, [decision(3, "move", "index:0")])
+    assert optimized == ["Grab cup", "Walk to table", "Grab cup", "Walk to table"]
+    assert origins == [3, 0, 1, 2]
+
+def test_single_move_matches_pop_and_insert():
+    rng = random.Random(0)
+    for _ in range(500):
+        sequence = [f"action {rng.randrange(4)}" for _ in range(rng.randrange(1, 12))]
+        index, target = rng.randrange(len(sequence)), rng.randrange(len(sequence))
+        expected = sequence.copy()
+        expected.insert(target, expected.pop(index))
+        optimized, _ = apply_edit_script(sequence, [decision(index, "move", f"index:{target}")])
+        assert optimized == expected
+
+def test_long_plans_are_edited_quickly():
+    rng = random.Random(1)
+    sequence = [f"action {i % 50}" for i in range(10000)]
+    results = []
+    for index in range(len(sequence)):
+        roll = rng.random()
+        if roll < 0.1:
+            results.append(decision(index, "remove"))
+        elif roll < 0.15:
+            results.append(decision(index, "move", f"index:{rng.randrange(len(sequence))}"))
+        elif roll < 0.2:
+            results.append(decision(index, "augment", actions_to_add=["Open door"]))
+        else:
+            results.append(decision(index, "keep"))
+    start = time.perf_counter()
+    optimized, origins = apply_edit_script(sequence, results)
+    assert time.perf_counter() - start < 1.0
+    assert len(optimized) == len(origins)
+    assert sorted(origin for origin in origins if origin is not None) == \
+        [result["action_index"] for result in results
+         if result["analysis"]["optimization_decision"]["decision"] != "remove"]
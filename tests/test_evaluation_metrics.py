@@ -0,0 +1,53 @@
+from src.evaluation.metrics import count_inversions, lcs_length, order_errors
+import numpy as np
+import time
+
+def reference_lcs(a, b) -> int:
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+def reference_order_errors(predicted, ground_truth) -> int:
+    # k-th occurrence in the prediction matches the k-th in the ground truth
+    positions = {}
+    for position, action in enumerate(ground_truth):
+        positions.setdefault(action, []).append(position)
+    seen = {}
+    matched = []
+    for action in predicted:
+        k = seen.get(action, 0)
+        seen[action] = k + 1
+        if k < len(positions.get(action, [])):
+            matched.append(positions[action][k])
+    return sum(1 for i in range(len(matched)) for j in range(i + 1, len(matched)) if matched[i] > matched[j])
+
+def test_lcs_length_matches_dynamic_programming():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        a = rng.integers(0, rng.integers(1, 8), size=rng.integers(0, 15)).astype(np.int32)
+        b = rng.integers(0, rng.integers(1, 8), size=rng.integers(0, 15)).astype(np.int32)
+        assert lcs_length(a, b) == reference_lcs(a.tolist(), b.tolist())
+
+def test_order_errors_match_pairwise_count():
+    rng = np.random.default_rng(1)
+    for _ in range(2000):
+        predicted = rng.integers(0, 6, size=rng.integers(0, 15)).astype(np.int32)
+        ground_truth = rng.integers(0, 6, size=rng.integers(0, 15)).astype(np.int32)
+        assert order_errors(predicted, ground_truth) == reference_order_errors(predicted.tolist(),
+                                                                               ground_truth.tolist())
+
+def test_count_inversions_handles_ties():
+    rng = np.random.default_rng(2)
+    for _ in range(500):
+        values = rng.integers(0, 5, size=rng.integers(0, 20))
+        expected = sum(1 for i in range(len(values)) for j in range(i + 1, len(values)) if values[i] > values[j])
+        assert count_inversions(values) == expected
+
+def test_order_errors_on_long_plans():
+    n = 200000
+    ground_truth = np.arange(n, dtype=np.int32)
+    start = time.perf_counter()
+    assert order_errors(ground_truth[::-1].copy(), ground_truth) == n * (n - 1) // 2
+    assert time.perf_counter() - start < 5
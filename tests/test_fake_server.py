@@ -0,0 +1,65 @@
+from src.benchmarks.fake_server import FakeMessagesServer
+from src.llm.scheduler import PRIORITY_LTL, PRIORITY_WINDOW, RequestScheduler
+import pytest
+import threading
+import time
+
+pytest.importorskip("anthropic")
+from src.llm.backend import AnthropicBackend
+
+PROMPT = "CURRENT ACTION: Walk to kitchen"
+
+def _request(backend: AnthropicBackend):
+    return lambda: backend.complete(PROMPT, "claude-3-opus-20240229", max_tokens=256)
+
+def test_throttled_request_waits_for_retry_after():
+    with FakeMessagesServer(requests_per_minute=2, window=1.0) as server:
+        backend = AnthropicBackend("test", base_url=server.url)
+        scheduler = RequestScheduler(base_delay=0.01, max_retries=3, seed=0)
+        start = time.monotonic()
+        for _ in range(3):
+            assert scheduler.call(_request(backend)).text
+        assert server.stats["throttled"] == 1
+        assert scheduler.stats["retries"] == 1
+        # The server asked for a second; the backoff alone would be milliseconds
+        assert time.monotonic() - start >= 0.9
+
+def test_overloaded_requests_are_retried():
+    with FakeMessagesServer(error_rate=0.5, seed=3) as server:
+        backend = AnthropicBackend("test", base_url=server.url)
+        scheduler = RequestScheduler(base_delay=0.01, max_retries=10, seed=0)
+        for _ in range(10):
+            assert scheduler.call(_request(backend)).text
+        assert server.stats["errors"] > 0
+        assert scheduler.stats["retries"] == server.stats["errors"]
+        assert server.stats["completed"] == 10
+
+def test_translations_are_admitted_before_waiting_windows():
+    with FakeMessagesServer() as server:
+        backend = AnthropicBackend("test", base_url=server.url)
+        scheduler = RequestScheduler(requests_per_minute=120)
+        scheduler.request_bucket.level = 0
+        order = []
+
+        def call(label: str, priority: int):
+            scheduler.call(lambda: order.append(label) or backend.complete(PROMPT, "claude-3-opus-20240229"),
+                           priority=priority)
+
+        threads = [threading.Thread(target=call, args=(f"window{i}", PRIORITY_WINDOW)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        threads.append(threading.Thread(target=call, args=("ltl", PRIORITY_LTL)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+        assert order[0] == "ltl"
+        assert server.stats["completed"] == 3
+
+def test_slow_request_is_hedged():
+    with FakeMessagesServer(latency=0.3) as server:
+        backend = AnthropicBackend("test", base_url=server.url)
+        scheduler = RequestScheduler(hedge_after=0.1)
+        assert scheduler.call(_request(backend)).text
+        assert scheduler.stats["hedges"] == 1
+        assert server.stats["requests"] == 2
@@ -0,0 +1,108 @@
+from src.ltl.monitor import LTLfMonitor
+from src.ltl.parser import LTLSyntaxError, parse_ltl, validate_formula
+import pytest
+import random
+
+# Binding strength and associativity of the binary operators, loosest first
+BINARY = {"iff": (1, "<->", "left"), "implies": (2, "->", "right"), "or": (3, "|", "left"),
+          "and": (4, "&", "left"), "U": (5, "U", "right")}
+UNARY = {"not": "!", "X": "X", "G": "G", "F": "F"}
+UNARY_LEVEL = 6
+
+def to_text(formula, level: int = 0) -> str:
+    """Prints a parsed formula with only the parentheses precedence requires"""
+    kind = formula[0]
+    if kind == "ap":
+        return formula[1]
+    if kind == "const":
+        return "true" if formula[1] else "false"
+    if kind in UNARY:
+        text, own = f"{UNARY[kind]} {to_text(formula[1], UNARY_LEVEL)}", UNARY_LEVEL
+    else:
+        own, operator, associativity = BINARY[kind]
+        left = to_text(formula[1], own if associativity == "left" else own + 1)
+        right = to_text(formula[2], own if associativity == "right" else own + 1)
+        text = f"{left} {operator} {right}"
+    return f"({text})" if own < level else text
+
+def random_tree(rng: random.Random, depth: int):
+    if depth == 0 or rng.random() < 0.2:
+        return ("ap", rng.choice("abc")) if rng.random() < 0.8 else ("const", rng.random() < 0.5)
+    kind = rng.choice(list(UNARY) + list(BINARY))
+    if kind in UNARY:
+        return (kind, random_tree(rng, depth - 1))
+    return (kind, random_tree(rng, depth - 1), random_tree(rng, depth - 1))
+
+a, b, c = ("ap", "a"), ("ap", "b"), ("ap", "c")
+
+@pytest.mark.parametrize("formula, expected", [
+    ("a | b & c", ("or", a, ("and", b, c))),
+    ("a & b | c", ("or", ("and", a, b), c)),
+    ("a -> b | c", ("implies", a, ("or", b, c))),
+    ("a <-> b -> c", ("iff", a, ("implies", b, c))),
+    ("a & b U c", ("and", a, ("U", b, c))),
+    ("!a U b", ("U", ("not", a), b)),
+    ("G a -> F b", ("implies", ("G", a), ("F", b))),
+    ("!(a | b)", ("not", ("or", a, b))),
+])
+def test_precedence(formula, expected):
+    assert parse_ltl(formula) == expected
+
+@pytest.mark.parametrize("formula, expected", [
+    ("a -> b -> c", ("implies", a, ("implies", b, c))),
+    ("a U b U c", ("U", a, ("U", b, c))),
+    ("a & b & c", ("and", ("and", a, b), c)),
+    ("a | b | c", ("or", ("or", a, b), c)),
+    ("a <-> b <-> c", ("iff", ("iff", a, b), c)),
+])
+def test_associativity(formula, expected):
+    assert parse_ltl(formula) == expected
+
+@pytest.mark.parametrize("formula, expected", [
+    ("GF a", ("G", ("F", a))),
+    ("XX a", ("X", ("X", a))),
+    ("! X G ! a", ("not", ("X", ("G", ("not", a))))),
+    ("!!a", ("not", ("not", a))),
+    ("G(F a)", ("G", ("F", a))),
+    ("GFa", ("ap", "GFa")),
+])
+def test_unary_chains(formula, expected):
+    assert parse_ltl(formula) == expected
+
+@pytest.mark.parametrize("formula, message", [
+    ("", "Empty formula"),
+    ("a &", "Unexpected end of formula"),
+    ("G", "Unexpected end of formula"),
+    ("(a | b", "Missing closing parenthesis"),
+    ("a b", "Unexpected token 'b' at position 2"),
+    ("a -> -> b", "Unexpected token '->' at position 5"),
+    ("a U U b", "Unexpected token 'U' at position 4"),
+    (")", "Unexpected token ')' at position 0"),
+    ("(a b)", "Expected ')' but found 'b' at position 3"),
+    ("a $ b", "Unexpected character '$' at position 2"),
+    ("  a # b", "Unexpected character '#' at position 4"),
+])
+def test_error_positions(formula, message):
+    with pytest.raises(LTLSyntaxError) as error:
+        parse_ltl(formula)
+    assert str(error.value) == message
+
+def test_printed_formulas_parse_back():
+    rng = random.Random(0)
+    for _ in range(2000):
+        tree = random_tree(rng, 4)
+        assert parse_ltl(to_text(tree)) == tree, to_text(tree)
+
+def test_unicode_formula_runs_the_same_monitor():
+    ascii_formula = "G(a -> F b) & !c U b"
+    unicode_formula = "START: □(a → ◇ b) ∧ ¬c U b FINISH."
+    assert validate_formula(unicode_formula) == {"success": True, "atomic_propositions": ["a", "b", "c"]}
+
+    rng = random.Random(1)
+    monitors = [LTLfMonitor(text, mapper=lambda action: action.split())
+                for text in (ascii_formula, unicode_formula, to_text(parse_ltl(ascii_formula)))]
+    assert len({monitor.initial_state for monitor in monitors}) == 1
+    for _ in range(200):
+        plan = [" ".join(p for p in "abc" if rng.random() < 0.4) for _ in range(rng.randrange(1, 7))]
+        reports = [monitor.analyze(plan) for monitor in monitors]
+        assert len({(report.accepted, tuple(report.necessary)) for report in reports}) == 1, plan
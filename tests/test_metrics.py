@@ -0,0 +1,67 @@
+from src.utils.metrics import LATENCY_BUCKETS, MetricsRegistry
+import json
+
+def _worker_summary(task_id: str, latencies) -> dict:
+    worker = MetricsRegistry()
+    worker.begin_task(task_id)
+    worker.increment("llm_calls", stage="translation")
+    for latency in latencies:
+        worker.observe("stage", latency, stage="translation")
+    return worker.end_task()
+
+def test_end_task_returns_and_drops_the_task_scope():
+    metrics = MetricsRegistry()
+    for task_id in ("a", "b", "c"):
+        metrics.begin_task(task_id)
+        metrics.increment("llm_calls", stage="translation")
+        metrics.observe("stage", 0.02, stage="translation")
+        summary = metrics.end_task()
+        assert summary["counters"] == [{"name": "llm_calls", "labels": {"stage": "translation"}, "value": 1}]
+        assert summary["timers"][0]["count"] == 1
+
+    assert metrics.summary()["tasks"] == {}
+    assert metrics.summary()["global"]["counters"][0]["value"] == 3
+    metrics.increment("llm_calls", stage="translation")
+    assert metrics.end_task() == {"counters": [], "timers": []}
+
+def test_merged_task_summaries_add_up():
+    metrics = MetricsRegistry()
+    metrics.merge(_worker_summary("a", [0.002, 0.3]))
+    metrics.merge(_worker_summary("b", [0.3, 45.0]))
+
+    summary = metrics.summary()["global"]
+    assert summary["counters"][0]["value"] == 2
+    timer = summary["timers"][0]
+    assert timer["count"] == 4
+    assert abs(timer["sum"] - 45.602) < 1e-9
+    assert timer["p50"] == 0.5
+    assert sum(timer["buckets"]) == 4
+    assert timer["buckets"][LATENCY_BUCKETS.index(0.5)] == 2
+
+def test_prometheus_export():
+    metrics = MetricsRegistry()
+    metrics.increment("tokens", 120, stage="translation", kind="input")
+    metrics.observe("stage", 0.3, stage="translation")
+    metrics.observe("stage", 100.0, stage="translation")
+    lines = metrics.to_prometheus().splitlines()
+
+    assert "# TYPE verifyllm_tokens_total counter" in lines
+    assert 'verifyllm_tokens_total{kind="input",stage="translation"} 120' in lines
+    assert "# TYPE verifyllm_stage_seconds histogram" in lines
+    buckets = [line for line in lines if line.startswith("verifyllm_stage_seconds_bucket")]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert buckets[LATENCY_BUCKETS.index(0.5)] == 'verifyllm_stage_seconds_bucket{stage="translation",le="0.5"} 1'
+    assert buckets[-1] == 'verifyllm_stage_seconds_bucket{stage="translation",le="+Inf"} 2'
+    assert 'verifyllm_stage_seconds_sum{stage="translation"} 100.300000' in lines
+    assert 'verifyllm_stage_seconds_count{stage="translation"} 2' in lines
+
+def test_write_exports_both_formats(tmp_path):
+    metrics = MetricsRegistry()
+    metrics.merge(_worker_summary("a", [0.01]))
+    json_path, prometheus_path = tmp_path / "metrics.json", tmp_path / "metrics.prom"
+    metrics.write(str(json_path), str(prometheus_path))
+
+    assert json.loads(json_path.read_text())["global"]["counters"][0]["name"] == "llm_calls"
+    assert prometheus_path.read_text() == metrics.to_prometheus()
@@ -0,0 +1,71 @@
+from src.ltl.monitor import LTLfMonitor
+from src.ltl.parser import parse_ltl
+import random
+
+PROPOSITIONS = ["a", "b", "c"]
+
+def holds(formula, trace, i: int = 0) -> bool:
+    """Reference LTLf semantics; position len(trace) is the empty suffix"""
+    kind = formula[0]
+    n = len(trace)
+    if kind == "ap":
+        return i < n and formula[1] in trace[i]
+    if kind == "const":
+        return formula[1]
+    if kind == "not":
+        return not holds(formula[1], trace, i)
+    if kind == "and":
+        return holds(formula[1], trace, i) and holds(formula[2], trace, i)
+    if kind == "or":
+        return holds(formula[1], trace, i) or holds(formula[2], trace, i)
+    if kind == "implies":
+        return not holds(formula[1], trace, i) or holds(formula[2], trace, i)
+    if kind == "iff":
+        return holds(formula[1], trace, i) == holds(formula[2], trace, i)
+    if kind == "X":
+        return i + 1 < n and holds(formula[1], trace, i + 1)
+    if kind == "G":
+        return all(holds(formula[1], trace, j) for j in range(i, n))
+    if kind == "F":
+        return any(holds(formula[1], trace, j) for j in range(i, n))
+    return any(holds(formula[2], trace, j) and all(holds(formula[1], trace, k) for k in range(i, j))
+               for j in range(i, n))
+
+def random_formula(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(PROPOSITIONS + ["true", "false"])
+    operator = rng.choice(["!", "X", "G", "F", "&", "|", "->", "<->", "U"])
+    if operator in ("!", "X", "G", "F"):
+        return f"{operator}({random_formula(rng, depth - 1)})"
+    return f"({random_formula(rng, depth - 1)} {operator} {random_formula(rng, depth - 1)})"
+
+def monitor_for(formula: str) -> LTLfMonitor:
+    # Actions are written as the propositions that hold, e.g. "a c"
+    return LTLfMonitor(formula, mapper=lambda action: action.split())
+
+def accepts(formula: str, trace) -> bool:
+    return monitor_for(formula).analyze([" ".join(sorted(step)) for step in trace]).accepted
+
+def test_next_at_the_end_of_the_trace():
+    assert not accepts("X(G a)", [{"c"}])
+    assert not accepts("G(X(c <-> c))", [{"c"}] * 5)
+    assert accepts("!X(c -> c)", [{"c"}])
+    assert accepts("X(G a)", [{"c"}, {"a"}])
+
+def test_acceptance_matches_reference_semantics():
+    rng = random.Random(0)
+    for _ in range(3000):
+        formula = random_formula(rng, 3)
+        trace = [{p for p in PROPOSITIONS if rng.random() < 0.5} for _ in range(rng.randrange(0, 6))]
+        assert accepts(formula, trace) == holds(parse_ltl(formula), trace), (formula, trace)
+
+def test_necessary_actions_match_reference_semantics():
+    rng = random.Random(1)
+    for _ in range(500):
+        formula = random_formula(rng, 3)
+        trace = [{p for p in PROPOSITIONS if rng.random() < 0.5} for _ in range(rng.randrange(1, 6))]
+        report = monitor_for(formula).analyze([" ".join(sorted(step)) for step in trace])
+        parsed = parse_ltl(formula)
+        expected = [i for i in range(len(trace)) if holds(parsed, trace)
+                    and not holds(parsed, trace[:i] + trace[i + 1:])]
+        assert report.necessary == expected, (formula, trace)
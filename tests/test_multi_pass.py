@@ -0,0 +1,51 @@
+from src.benchmarks.stub_backend import StubBackend
+from src.optimization.context_window import ContextWindowOptimizer
+
+class WaitRemovingBackend(StubBackend):
+    """Removes "Wait" as well as repeats of the previous action"""
+
+    def __init__(self):
+        super().__init__()
+        self.window_calls = 0
+
+    def window_response(self, prompt: str, compact: bool) -> str:
+        self.window_calls += 1
+        if self._field(prompt, r"Current action: (.*)") == "Wait":
+            return '{"decision": "remove", "position_change": null, "actions_to_add": [], ' \
+                   '"is_position_optimal": true, "is_action_necessary": false, "reason": "Idle"}'
+        return super().window_response(prompt, compact)
+
+def test_edits_converge_reusing_untouched_windows(tmp_path):
+    sequence = ["Walk to kitchen", "Find cup", "Grab cup", "Walk to sink", "Wait", "Walk to sink",
+                "Put cup in sink", "Turn on faucet", "Wash cup", "Turn off faucet", "Walk to table"]
+    backend = WaitRemovingBackend()
+    optimizer = ContextWindowOptimizer("test", look_back=1, look_forward=1, backend=backend,
+                                       response_format="compact", max_passes=5,
+                                       log_dir=str(tmp_path), verbose=False)
+    result = optimizer.optimize_sequence(sequence, ["in_sink"], "Wash the cup")
+    assert result.success, result.error
+
+    expected = sequence[:4] + sequence[6:]
+    assert result.data["optimized_sequence"] == expected
+    evolution = result.data["optimization_steps"]
+    passes = evolution["passes"]
+    assert evolution["converged"]
+    assert [p["removed"] for p in passes] == [[4], [4], []]
+    assert passes[-1]["input_sequence"] == passes[-1]["output_sequence"] == expected
+
+    # After the first pass only windows next to an edit are sent again
+    assert len(passes[0]["analyzed"]) == len(sequence)
+    for later in passes[1:]:
+        assert later["reused"]
+        assert len(later["analyzed"]) + len(later["reused"]) == len(later["input_sequence"])
+        assert len(later["analyzed"]) <= 3
+    assert backend.window_calls == sum(len(p["analyzed"]) for p in passes)
+
+def test_single_pass_keeps_the_list_api(tmp_path):
+    optimizer = ContextWindowOptimizer("test", backend=StubBackend(), log_dir=str(tmp_path), verbose=False)
+    sequence = ["Walk to sink", "Walk to sink", "Wash cup"]
+    result = optimizer.optimize_sequence(sequence, ["in_sink"], "Wash the cup")
+    assert "passes" not in result.data["optimization_steps"]
+    results = [{"action_index": 1, "analysis": {"optimization_decision": {
+        "decision": "remove", "suggested_changes": {"remove_action": True}}}}]
+    assert optimizer.apply_sequence_optimizations(sequence, results) == ["Walk to sink", "Wash cup"]
@@ -0,0 +1,80 @@
+from src.benchmarks.stub_backend import StubBackend
+from src.optimization.context_window import ContextWindowOptimizer
+import threading
+import time
+
+ACTIONS = [f"Walk to room{i}" for i in range(12)]
+
+class SlowBackend(StubBackend):
+    """Delays each window by its action's delay; windows of blocked actions
+    also wait until release is set"""
+
+    def __init__(self, delays=None, release: threading.Event = None, blocked=()):
+        super().__init__()
+        self.delays = delays or {}
+        self.release = release
+        self.blocked = set(blocked)
+        self.started = []
+
+    def window_response(self, prompt: str, compact: bool) -> str:
+        current = self._field(prompt, r"Current action: (.*)")
+        with self._lock:
+            self.started.append(current)
+        if current in self.blocked:
+            self.release.wait(timeout=10)
+        time.sleep(self.delays.get(current, 0))
+        return super().window_response(prompt, compact)
+
+def make_optimizer(backend: StubBackend, tmp_path, max_concurrency: int = 1) -> ContextWindowOptimizer:
+    return ContextWindowOptimizer("test", look_back=1, look_forward=2, backend=backend,
+                                  max_concurrency=max_concurrency, response_format="compact",
+                                  log_dir=str(tmp_path), verbose=False)
+
+def counted(actions, consumed):
+    for action in actions:
+        consumed.append(action)
+        yield action
+
+def test_results_arrive_in_order_with_full_windows(tmp_path):
+    # Later windows finish first
+    delays = {action: 0.002 * (len(ACTIONS) - i) for i, action in enumerate(ACTIONS)}
+    optimizer = make_optimizer(SlowBackend(delays), tmp_path, max_concurrency=4)
+    results = list(optimizer.optimize_stream(iter(ACTIONS), ["at_room"], "Tour the rooms"))
+
+    assert [result["action_index"] for result in results] == list(range(len(ACTIONS)))
+    for result in results:
+        assert "analysis" in result, result.get("error")
+        assert result["window_info"] == optimizer.get_window_info(ACTIONS, result["action_index"])
+
+def test_closing_the_stream_stops_reading_actions(tmp_path):
+    for max_concurrency in (1, 3):
+        backend = SlowBackend()
+        optimizer = make_optimizer(backend, tmp_path, max_concurrency)
+        consumed = []
+        stream = optimizer.optimize_stream(counted(ACTIONS, consumed), ["at_room"], "Tour the rooms")
+        taken = [next(stream)["action_index"] for _ in range(2)]
+        stream.close()
+
+        assert taken == [0, 1]
+        # Actions are only read to fill the look_forward context of the windows in flight
+        assert len(consumed) <= len(taken) + optimizer.look_forward + max_concurrency
+        assert len(backend.started) <= len(taken) + max_concurrency
+
+def test_closing_the_stream_abandons_windows_in_flight(tmp_path):
+    release = threading.Event()
+    backend = SlowBackend(release=release, blocked=set(ACTIONS[1:]))
+    optimizer = make_optimizer(backend, tmp_path, max_concurrency=3)
+    consumed = []
+    stream = optimizer.optimize_stream(counted(ACTIONS, consumed), ["at_room"], "Tour the rooms")
+    assert next(stream)["action_index"] == 0
+
+    started = time.perf_counter()
+    stream.close()
+    assert time.perf_counter() - started < 1.0
+
+    # Windows that were running finish in the background; queued ones are
+    # cancelled and no later window is started
+    release.set()
+    time.sleep(0.1)
+    assert set(backend.started) <= set(ACTIONS[:3])
+    assert len(consumed) < len(ACTIONS)
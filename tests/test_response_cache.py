@@ -0,0 +1,77 @@
+from src.llm import cache as cache_module
+from src.llm.cache import ResponseCache
+import itertools
+import types
+
+def fake_clock(monkeypatch):
+    """Gives every write a distinct, increasing last_access"""
+    ticks = itertools.count()
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+def test_hits_and_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    key = ResponseCache.make_key("model", 256, 0, "prompt", "system")
+    assert key != ResponseCache.make_key("model", 256, 0, "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "response")
+    cache.put(key, "newer response")
+    assert cache.get(key) == "newer response"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted_in_batches(tmp_path, monkeypatch):
+    fake_clock(monkeypatch)
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=10)
+    assert cache.low_watermark == 9
+    for i in range(10):
+        cache.put(f"k{i}", str(i))
+    for i in (0, 1, 2):
+        assert cache.get(f"k{i}") == str(i)
+
+    cache.put("k10", "10")
+    assert len(cache) == 9
+    assert cache.get("k3") is None and cache.get("k4") is None
+    assert all(cache.get(f"k{i}") is not None for i in (0, 1, 2, 5, 10))
+    cache.close()
+
+def test_table_is_only_counted_when_the_estimate_passes_max_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=100)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    for i in range(1000):
+        cache.put(f"k{i}", "response")
+    counts = [statement for statement in statements if "COUNT(*)" in statement]
+    # One recount per eviction batch of 10 entries
+    assert 80 <= len(counts) <= 100
+    assert len(cache) <= 100
+    cache.close()
+
+def test_reopened_cache_keeps_its_bound(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writers = [ResponseCache(path, max_entries=20), ResponseCache(path, max_entries=20)]
+    for i in range(200):
+        writers[i % 2].put(f"k{i}", "response")
+    # Each writer can add one batch before it recounts the table
+    assert len(writers[0]) <= 20 + 2 * (20 - writers[0].low_watermark)
+    for writer in writers:
+        writer.close()
+    reopened = ResponseCache(path, max_entries=5)
+    reopened.put("new", "response")
+    assert len(reopened) <= 5
+    reopened.close()
+
+def test_read_only_cache_does_not_write(tmp_path, monkeypatch):
+    fake_clock(monkeypatch)
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(path)
+    writer.put("key", "response")
+    writer.close()
+
+    reader = ResponseCache(path, read_only=True)
+    assert reader.get("key") == "response"
+    assert reader.get("missing") is None
+    reader.put("other", "response")
+    assert len(reader) == 1
+    assert reader._conn.execute("SELECT last_access FROM responses").fetchone()[0] == 0.0
+    assert reader.stats()["hits"] == 1
+    reader.close()
@@ -0,0 +1,24 @@
+from src.benchmarks.stub_backend import StubBackend
+from src.optimization.context_window import ContextWindowOptimizer
+from src.optimization.rules import DEFAULT_DETECTORS, consecutive_duplicates, detect, find_walk_order
+
+def test_find_walk_order_targets_first_of_repeated_finds():
+    decisions = find_walk_order(["Find cup", "Find cup", "Walk to cup", "Grab cup"])
+    assert decisions[2]["position_change"] == "index:0"
+
+def test_duplicate_find_before_walk_is_fixed_in_one_pass(tmp_path):
+    sequence = ["Find cup", "Find cup", "Walk to cup", "Grab cup"]
+    resolved = detect(sequence)
+    assert resolved[1][0] == "consecutive_duplicates"
+    assert resolved[2][0] == "find_walk_order"
+
+    optimizer = ContextWindowOptimizer("test", backend=StubBackend(), rules=DEFAULT_DETECTORS,
+                                       log_dir=str(tmp_path), verbose=False)
+    result = optimizer.optimize_sequence(sequence, ["find_cup"], "Grab the cup")
+    assert result.success, result.error
+    assert result.data["optimized_sequence"] == ["Walk to cup", "Find cup", "Grab cup"]
+
+def test_only_idempotent_repeats_are_removed():
+    sequence = ["Walk to table", "Walk to table", "Look at cup", "Look at cup",
+                "Grab cup", "Grab cup", "Cut bread", "Cut bread"]
+    assert sorted(consecutive_duplicates(sequence)) == [1, 3]
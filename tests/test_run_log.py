@@ -0,0 +1,42 @@
+from src.benchmarks.stub_backend import StubBackend
+from src.optimization.context_window import ContextWindowOptimizer
+from src.utils.run_log import RunLogWriter, load_steps, read_run_log
+import threading
+
+def test_steps_of_tasks_sharing_a_goal_stay_apart(tmp_path):
+    optimizer = ContextWindowOptimizer("test", backend=StubBackend(), log_dir=str(tmp_path), verbose=False)
+    goal = "Put a cup in the sink"
+    plans = {"alfred:1": ["Walk to sink", "Put cup in sink"],
+             "alfred:2": ["Walk to table", "Grab cup", "Walk to sink", "Put cup in sink"]}
+    for task_id, plan in plans.items():
+        assert optimizer.optimize_sequence(plan, ["in_sink"], goal, task_id=task_id).success
+    optimizer.run_log.close()
+
+    assert len(load_steps(str(tmp_path), task=goal)) == 6
+    for task_id, plan in plans.items():
+        steps = load_steps(str(tmp_path), task_id=task_id)
+        assert [step["action"] for step in steps] == plan
+
+def _log_in_thread(writer: RunLogWriter, count: int) -> threading.Thread:
+    thread = threading.Thread(target=lambda: [writer.log("step", step=i) for i in range(count)], daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    return thread
+
+def test_unserializable_record_is_dropped(tmp_path):
+    path = str(tmp_path / "run.jsonl.gz")
+    writer = RunLogWriter(path, max_queue=5)
+    writer.log("step", value=object())
+    assert not _log_in_thread(writer, 50).is_alive()
+    writer.close()
+    assert writer.dropped == 1
+    assert [record["step"] for record in read_run_log(path)] == list(range(50))
+
+def test_write_error_does_not_block_callers(tmp_path):
+    # A directory in place of the log file makes opening it fail
+    path = tmp_path / "run.jsonl.gz"
+    path.mkdir()
+    writer = RunLogWriter(str(path), max_queue=5)
+    assert not _log_in_thread(writer, 50).is_alive()
+    assert isinstance(writer.error, OSError)
+    writer.close()
@@ -0,0 +1,43 @@
+from src.llm.scheduler import RequestScheduler
+import threading
+import time
+
+def _slow_then_fast(first_delay: float):
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(len(calls))
+            attempt = calls[-1]
+        time.sleep(first_delay if attempt == 0 else 0.01)
+        return attempt
+    return fn, calls
+
+def test_hedge_wins_over_slow_primary():
+    scheduler = RequestScheduler(hedge_after=0.1)
+    fn, calls = _slow_then_fast(1.0)
+    start = time.monotonic()
+    assert scheduler.call(fn) == 1
+    assert time.monotonic() - start < 0.5
+    assert scheduler.stats["hedges"] == 1 and scheduler.stats["hedge_wins"] == 1
+
+def test_hedge_is_skipped_without_budget():
+    scheduler = RequestScheduler(requests_per_minute=60, hedge_after=0.2)
+    scheduler.request_bucket.level = 1
+    start = time.monotonic()
+    assert scheduler.call(lambda: time.sleep(0.4) or "done") == "done"
+    # The primary's result is not held back waiting for budget for a hedge
+    assert time.monotonic() - start < 0.7
+    assert scheduler.stats["hedges"] == 0
+
+def test_hedged_requests_are_settled():
+    scheduler = RequestScheduler(tokens_per_minute=60000, hedge_after=0.1)
+    settled = []
+    settle = scheduler.settle
+    scheduler.settle = lambda reserved, used: settled.append((reserved, used)) or settle(reserved, used)
+    fn, calls = _slow_then_fast(0.5)
+    assert scheduler.call(fn, tokens=100, measure=lambda result: 40) == 1
+    time.sleep(0.6)
+    # Both the winning hedge and the primary that finished later
+    assert settled == [(100, 40), (100, 40)]
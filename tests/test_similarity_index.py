@@ -0,0 +1,32 @@
+from src.ltl.similarity_index import TranslationIndex
+from src.models import LTLResult
+
+def _index(*instructions: str) -> TranslationIndex:
+    index = TranslationIndex()
+    for instruction in instructions:
+        index.add(instruction, LTLResult(formula=f"F({instruction})", atomic_propositions=[instruction], success=True))
+    return index
+
+def test_wording_differences_are_reused():
+    match = _index("Put a pencil in the drawer").lookup("To put the pencil in a drawer.")
+    assert match is not None and match.reusable
+    assert match.formula == "F(Put a pencil in the drawer)"
+
+def test_plural_is_only_seeded():
+    match = _index("Put a pencil in the drawer").lookup("Put the pencils in the drawer")
+    assert match is not None and match.similarity == 1.0
+    assert not match.reusable
+
+def test_swapped_object_in_long_goal_is_only_seeded():
+    stored = ("Walk to the kitchen then open the fridge and take out the milk carton and close the fridge door "
+              "and walk over to the counter and pour some milk into the glass standing right next to the sink")
+    query = stored.replace("glass", "cup")
+    match = _index(stored).lookup(query)
+    assert match is not None and match.similarity >= 0.9
+    assert not match.reusable
+
+def test_swapped_objects_are_only_seeded():
+    match = _index("Put the knife in the pan then put the tomato in the bowl").lookup(
+        "Put the tomato in the pan then put the knife in the bowl")
+    assert match is not None
+    assert not match.reusable
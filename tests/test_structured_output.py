@@ -0,0 +1,79 @@
+from src.benchmarks.stub_backend import StubBackend
+from src.optimization.context_window import ContextWindowOptimizer
+from src.optimization.structured_output import JSONObjectScanner
+import json
+import random
+
+DECISION = {"decision": "keep", "position_change": None, "actions_to_add": [],
+            "is_position_optimal": True, "is_action_necessary": True, "reason": ""}
+TRICKY = '{"reason": "a \\"}\\" {brace} and \\\\", "nested": {"x": "}{"}, "decision": "keep"}'
+
+def scan(chunks) -> JSONObjectScanner:
+    scanner = JSONObjectScanner()
+    for chunk in chunks:
+        if scanner.feed(chunk):
+            break
+    return scanner
+
+def test_quotes_and_braces_inside_strings():
+    text = "Here it is: " + TRICKY + ' trailing {"second": 1}'
+    scanner = scan([text])
+    assert scanner.object_text == TRICKY
+    assert json.loads(scanner.object_text)["reason"] == 'a "}" {brace} and \\'
+    assert scanner.text == "Here it is: " + TRICKY
+
+def test_object_split_across_chunks():
+    text = "Sure. " + TRICKY + " done"
+    end = text.index(TRICKY) + len(TRICKY)
+    for split in range(1, len(text)):
+        scanner = JSONObjectScanner()
+        assert scanner.feed(text[:split]) == (split >= end)
+        if split < end:
+            assert scanner.object_text is None
+            assert scanner.feed(text[split:])
+        assert scanner.object_text == TRICKY, split
+
+    rng = random.Random(0)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), 8))
+        chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert scan(chunks).object_text == TRICKY
+    assert scan(text).object_text == TRICKY
+
+def test_truncated_stream_is_not_complete():
+    scanner = scan([TRICKY[:20], TRICKY[20:-1]])
+    assert not scanner.complete
+    assert scanner.object_text is None
+    assert scanner.text == TRICKY[:-1]
+    assert scan(["no object here"]).text == "no object here"
+
+class TruncatingBackend(StubBackend):
+    """Answers windows with an object that the stream ends in the middle of"""
+
+    def window_response(self, prompt: str, compact: bool) -> str:
+        return "Decision: " + json.dumps(DECISION)[:40]
+
+class UnstoppableBackend(StubBackend):
+    """Ignores the stop callback and returns the whole text, prose included"""
+
+    def complete(self, prompt, model, max_tokens=1024, temperature=0, system=None, stop=None):
+        return super().complete(prompt, model, max_tokens, temperature, system)
+
+    def window_response(self, prompt: str, compact: bool) -> str:
+        return "I would keep it: " + json.dumps(DECISION) + "\nThe {other} actions look fine."
+
+def analyze(backend: StubBackend, tmp_path) -> dict:
+    optimizer = ContextWindowOptimizer("test", backend=backend, response_format="compact",
+                                       log_dir=str(tmp_path), verbose=False)
+    window_info = optimizer.get_window_info(["Walk to sink", "Wash cup", "Walk to table"], 1)
+    return optimizer.analyze_window(window_info, ["clean_cup"], "Wash the cup")
+
+def test_truncated_stream_falls_back_to_the_full_text(tmp_path):
+    result = analyze(TruncatingBackend(), tmp_path)
+    assert result["error_type"] == "json"
+    assert result["raw_response"] == "Decision: " + json.dumps(DECISION)[:40]
+
+def test_full_text_is_scanned_when_the_stream_was_not_stopped(tmp_path):
+    result = analyze(UnstoppableBackend(), tmp_path)
+    assert "error" not in result, result.get("error")
+    assert result["analysis"]["optimization_decision"]["decision"] == "keep"